@@ -2,63 +2,214 @@
 Authentication utilities: password hashing and JWT token management.
 
 This module handles:
-- Password hashing with bcrypt (one-way encryption, can't be reversed)
+- Password hashing with Argon2id (one-way encryption, can't be reversed)
 - JWT token creation and verification
 - User authentication dependency for protected routes
 
 Security best practices:
 - Never store plain text passwords
-- Use bcrypt with salt rounds (slow by design to prevent brute force)
+- Use Argon2id with OWASP's memory-hard parameters (slow by design to prevent brute force)
+- Legacy bcrypt hashes still verify and are upgraded to Argon2id on login
 - JWT tokens expire after 30 minutes
-- Tokens include user ID and email in payload
+- Tokens include user ID, email and active flag in payload
+- Verified tokens are cached by digest only (raw tokens are never kept)
 """
 
-from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import List, Optional
+import bcrypt
+import jwt
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from cachetools import TTLCache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import exists, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.config import settings
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.models import User, Account
 
-# Password hashing context
-# bcrypt is slow by design (intentionally) to prevent brute force attacks
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
+
+# JWT settings read once at import so the token hot path uses plain globals
+# (changing them requires a restart anyway)
+_SECRET = settings.SECRET_KEY
+_ALG = settings.ALGORITHM
+_ALGORITHMS = [_ALG]
+_EXP_MIN = settings.ACCESS_TOKEN_EXPIRE_MINUTES
+
+# One PyJWT instance for every encode/decode, with its options merged once here
+# instead of per call ("exp" and "sub" must be present in every token)
+_jwt = jwt.PyJWT(options={"require": ["exp", "sub"]})
+
+# Signing key prepared once by the algorithm itself (for HS256: the secret as
+# bytes, checked not to be a PEM/SSH key), so a bad SECRET_KEY fails at
+# startup and every encode/decode is handed ready-made key bytes
+_SIGNING_KEY = jwt.PyJWS().get_algorithm_by_name(_ALG).prepare_key(_SECRET)
+
+# Argon2id hasher (OWASP: 46 MiB of memory per hash, single lane)
+# Argon2 is slow and memory-hard by design to prevent brute force attacks
+# (including GPU/ASIC cracking, which bcrypt resists less well)
+_ph = PasswordHasher(time_cost=3, memory_cost=46 * 1024, parallelism=1)
+
+# Hashes created before the Argon2 switch are bcrypt ("$2a$"/"$2b$"/"$2y$")
+_BCRYPT_PREFIX = "$2"
+
+# Hashing runs on worker threads so a 100-300ms hash doesn't stall the
+# event loop (argon2-cffi and bcrypt both release the GIL while they work).
+# The pool size bounds how many 46 MiB Argon2 buffers exist at once: a burst
+# of logins queues here instead of allocating and page-faulting one region
+# per concurrent request.
+_hash_pool = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS or os.cpu_count(),
+    thread_name_prefix="password-hash"
+)
 
 # OAuth2 scheme: tells FastAPI where to look for tokens (Authorization header)
 # Made optional for open access mode - won't fail on requests without tokens
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+@dataclass(frozen=True)
+class UserClaims:
+    """Identity of the current user, as asserted by a verified JWT."""
+    id: int
+    email: str
+    is_active: bool
+
+
+# Verified-token cache: repeated requests with the same bearer token skip the
+# HS256 verification. Entries live for at most 5 seconds and never past the
+# token's own "exp" claim.
+# Value: (UserClaims, expires_at)
+_token_cache: TTLCache = TTLCache(maxsize=10_000, ttl=5)
+
+
+def _token_cache_key(token: str) -> bytes:
+    """Cache key for a bearer token (a digest, so raw tokens never sit in memory)."""
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+
+def _check_password(plain_password: str, hashed_password: str) -> bool:
+    if hashed_password.startswith(_BCRYPT_PREFIX):
+        return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
+    try:
+        return _ph.verify(hashed_password, plain_password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+
+def _hash_password(password: str) -> str:
+    return _ph.hash(password)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """
+    Check whether a stored hash should be replaced on the user's next login.
+    
+    True for legacy bcrypt hashes and for Argon2 hashes made with parameters
+    other than the current ones (e.g. after raising memory_cost).
+    """
+    if hashed_password.startswith(_BCRYPT_PREFIX):
+        return True
+    try:
+        return _ph.check_needs_rehash(hashed_password)
+    except InvalidHashError:
+        return True
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verify a plain password against a hashed password.
     
+    Accepts both Argon2id hashes and legacy bcrypt hashes. The check runs
+    in the hashing thread pool, so await this from async routes instead of
+    blocking the event loop.
+    
     Args:
         plain_password: The password the user entered
-        hashed_password: The stored bcrypt hash from database
+        hashed_password: The stored Argon2id or bcrypt hash from database
     
     Returns:
         True if passwords match, False otherwise
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_pool, _check_password, plain_password, hashed_password)
+
+
+# Hash checked when a login names an unknown email, so that branch spends the
+# same Argon2 time as a real password check. Computed once at import (~100ms
+# of startup) so even the first unknown-email login pays only the verify,
+# exactly like a login for a real account.
+_DUMMY_HASH = _hash_password("not-a-real-password")
+
+
+def _check_dummy_password(plain_password: str) -> bool:
+    _check_password(plain_password, _DUMMY_HASH)
+    return False
+
+
+async def verify_password_for_missing_user(plain_password: str) -> bool:
+    """
+    Burn one password verification for a login whose user doesn't exist.
+    
+    Without this, unknown emails return in well under a millisecond while
+    real ones take a full hash, which leaks which emails have accounts.
+    The dummy hash is precomputed at import time, so no request ever pays
+    for creating it.
+    
+    Args:
+        plain_password: The password the user entered
+    
+    Returns:
+        Always False
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_pool, _check_dummy_password, plain_password)
 
 
-def get_password_hash(password: str) -> str:
+async def get_password_hash(password: str) -> str:
     """
-    Hash a password using bcrypt.
+    Hash a password using Argon2id (in the hashing thread pool).
     
     Args:
         password: Plain text password
     
     Returns:
-        Bcrypt hash string (safe to store in database)
+        Argon2id hash string in PHC format (safe to store in database)
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_pool, _hash_password, password)
+
+
+async def hash_passwords_bulk(passwords: List[str]) -> List[str]:
+    """
+    Hash many passwords in parallel (e.g. for seed scripts or bulk user import).
+    
+    Each password is independent, so the batch is spread across every thread
+    in the hashing pool. argon2-cffi releases the GIL while hashing, so this
+    scales with CPU cores without the pickling overhead of a process pool.
+    
+    Args:
+        passwords: Plain text passwords
+    
+    Returns:
+        Argon2id hashes, in the same order as the input
     """
-    return pwd_context.hash(password)
+    loop = asyncio.get_running_loop()
+    return list(await asyncio.gather(
+        *(loop.run_in_executor(_hash_pool, _hash_password, p) for p in passwords)
+    ))
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -69,7 +220,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     No need to store tokens in database (stateless authentication).
     
     Args:
-        data: Dictionary to encode in token (typically {"sub": user_id, "email": email})
+        data: Dictionary to encode in token
+              (typically {"sub": str(user_id), "email": email, "active": is_active})
         expires_delta: Optional custom expiration time
     
     Returns:
@@ -77,40 +229,34 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     """
     to_encode = data.copy()
     
-    # Set expiration time
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    
-    to_encode.update({"exp": expire})
+    # Set expiration time (JWT "exp" is integer seconds since the epoch)
+    lifetime = int(expires_delta.total_seconds()) if expires_delta else _EXP_MIN * 60
+    to_encode["exp"] = int(time.time()) + lifetime
     
     # Encode token with secret key
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    encoded_jwt = _jwt.encode(to_encode, _SIGNING_KEY, algorithm=_ALG)
     return encoded_jwt
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
+def get_current_user_claims(token: str = Depends(oauth2_scheme)) -> UserClaims:
     """
-    Dependency function: extracts current user from JWT token.
+    Dependency function: extracts the current user's claims from the JWT token.
     
-    This is used in protected routes like:
+    No database access: user ID, email and active flag are trusted from the
+    signed token for its (short) lifetime. Use this for routes that only need
+    the user's ID:
         @app.get("/protected")
-        def protected_route(current_user: User = Depends(get_current_user)):
+        def protected_route(current_user: UserClaims = Depends(get_current_user_claims)):
             return {"user_id": current_user.id}
     
     Args:
         token: JWT token from Authorization header
-        db: Database session
     
     Returns:
-        User object if token is valid
+        UserClaims if token is valid and the account is active
     
     Raises:
-        HTTPException: If token is invalid or user doesn't exist
+        HTTPException: If token is invalid or the account is inactive
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -118,21 +264,80 @@ def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        # Decode and verify token
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: int = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
+    if not token:
         raise credentials_exception
     
-    # Fetch user from database
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise credentials_exception
+    # Fast path: token was verified recently and hasn't expired since
+    cache_key = _token_cache_key(token)
+    cached = _token_cache.get(cache_key)
+    if cached is not None and cached[1] <= time.time():
+        _token_cache.pop(cache_key, None)
+        cached = None
+    
+    if cached is not None:
+        claims = cached[0]
+    else:
+        try:
+            # Decode and verify token (claims are checked on the verified payload)
+            payload = _jwt.decode(token, _SIGNING_KEY, algorithms=_ALGORITHMS)
+            claims = UserClaims(
+                id=int(payload["sub"]),
+                email=payload.get("email"),
+                is_active=payload.get("active", True),
+            )
+        except jwt.ExpiredSignatureError:
+            # Routine for clients holding an old token: no logging, and
+            # "from None" skips chaining the decode error onto the 401
+            raise credentials_exception from None
+        except (jwt.InvalidTokenError, ValueError) as e:
+            # Malformed, tampered or wrongly-signed token: worth a log line
+            # (exception type only, never the token itself)
+            logger.info("Rejected invalid access token: %s", type(e).__name__)
+            raise credentials_exception from None
+        
+        _token_cache[cache_key] = (claims, payload["exp"])
     
     # Check if user is active
+    if not claims.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User account is inactive"
+        )
+    
+    return claims
+
+
+async def get_current_user_orm(
+    claims: UserClaims = Depends(get_current_user_claims),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """
+    Dependency function: loads the current user's row from the database.
+    
+    Only use this for routes that genuinely need the User object (e.g. to
+    return profile fields); get_current_user_claims avoids the query.
+    
+    Args:
+        claims: Verified claims from the JWT token
+        db: Async database session
+    
+    Returns:
+        User object if token is valid
+    
+    Raises:
+        HTTPException: If user doesn't exist or is inactive
+    """
+    # Session.get checks the identity map first and otherwise issues a
+    # primary-key SELECT that hits the connection's prepared-statement cache
+    user = await db.get(User, claims.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    # The database is authoritative once we have the row
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -152,13 +357,14 @@ def get_default_user(db: Session = Depends(get_db)) -> User:
         Default user (email: default@financetrack.local)
     """
     # Try to get default user by email
-    user = db.query(User).filter(User.email == "default@financetrack.local").first()
+    user = db.query(User).filter(func.lower(User.email) == "default@financetrack.local").first()
     
     if not user:
         # Create default user if it doesn't exist
         user = User(
             email="default@financetrack.local",
-            hashed_password=get_password_hash("default"),  # Not used but required
+            # Not used but required; sync dependencies already run off the event loop
+            hashed_password=_hash_password("default"),
             full_name="Default User",
             is_active=True
         )
@@ -166,8 +372,11 @@ def get_default_user(db: Session = Depends(get_db)) -> User:
         db.flush()  # Flush to get the user ID without committing
     
     # Ensure default account exists for this user
-    account = db.query(Account).filter(Account.user_id == user.id, Account.name == "Default Account").first()
-    if not account:
+    # EXISTS returns a single boolean instead of streaming the whole row back
+    has_account = db.scalar(
+        select(exists().where(Account.user_id == user.id, Account.name == "Default Account"))
+    )
+    if not has_account:
         account = Account(
             user_id=user.id,
             name="Default Account",
@@ -181,3 +390,36 @@ def get_default_user(db: Session = Depends(get_db)) -> User:
     
     return user
 
+
+# The default user's row never changes identity once created, so its claims
+# are remembered after the first request instead of re-running the
+# get-or-create queries on every request
+_default_user_claims: Optional[UserClaims] = None
+
+
+def get_default_user_claims(db: Session = Depends(get_db)) -> UserClaims:
+    """
+    Open-access counterpart of get_current_user_claims.
+    
+    Creates the default user (and account) on first use via
+    get_default_user, then returns the same claims without touching the
+    database. The session from get_db is lazy, so later requests never
+    check out a connection for it.
+    
+    Returns:
+        UserClaims of the default user
+    """
+    global _default_user_claims
+    if _default_user_claims is None:
+        user = get_default_user(db)
+        _default_user_claims = UserClaims(id=user.id, email=user.email, is_active=user.is_active)
+    return _default_user_claims
+
+
+# The user dependency routers should depend on: claims only (routes just
+# need current_user.id), for the shared default user in open-access mode or
+# the user behind the request's JWT otherwise
+current_user_dep = get_default_user_claims if settings.OPEN_ACCESS else get_current_user_claims
+
+# For the few routes that need the User row itself (GET /auth/me)
+current_user_orm_dep = get_default_user if settings.OPEN_ACCESS else get_current_user_orm
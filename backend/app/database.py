@@ -2,32 +2,118 @@
 Database connection and session management.
 
 This module sets up SQLAlchemy for PostgreSQL:
-- Engine: manages connection pooling
-- SessionLocal: creates database sessions for each request
+- get_engine(): manages connection pooling (created lazily on first use)
+- SessionLocal(): creates a database session
+- get_async_engine() / get_async_session_factory(): asyncpg-backed equivalents for async routes
 - Base: base class for all ORM models
 
 We use dependency injection to provide database sessions to route handlers.
+Async routes should use get_async_db so their queries are awaited on the
+event loop instead of hopping to FastAPI's threadpool. The sync engine stays
+for code that needs a blocking connection (LangChain's SQLDatabase, pandas,
+scripts like init_categories.py).
 """
 
+from functools import cache
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
 from app.config import settings
 
-# Create database engine
-# pool_pre_ping=True: verifies connections before using them (handles stale connections)
-# echo=True: logs all SQL queries (useful for debugging, disable in production)
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    echo=False  # Set to True for SQL query logging
-)
 
-# SessionLocal: factory for creating database sessions
-# autocommit=False: changes require explicit commit
-# autoflush=False: changes aren't automatically flushed to DB
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Engines and session factories are created on first use, not at import:
+# importing app.models (e.g. just for Base) doesn't build connection pools or
+# load asyncpg. functools.cache makes each one a per-process singleton.
+
+@cache
+def get_engine() -> Engine:
+    """
+    Return the sync database engine, creating it on first call.
+    
+    pool_pre_ping=True: verifies connections before using them (handles stale connections)
+    pool_use_lifo=True: reuse the most recently returned connection, so a few hot
+      connections serve most requests and idle ones can be recycled
+    Pass echo=True to create_engine when you need SQL query logging.
+    """
+    return create_engine(
+        settings.DATABASE_URL,
+        pool_pre_ping=True,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_use_lifo=True,
+        connect_args={"options": "-c jit=off"} if settings.DB_DISABLE_JIT else {},
+    )
+
+
+@cache
+def get_session_factory() -> sessionmaker:
+    """
+    Return the sync session factory (bound to get_engine()).
+    
+    autocommit=False: changes require explicit commit
+    autoflush=False: changes aren't automatically flushed to DB
+    """
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+
+
+def SessionLocal() -> Session:
+    """Create a new sync session (for scripts and code outside request handlers)."""
+    return get_session_factory()()
+
+
+@cache
+def get_async_engine() -> AsyncEngine:
+    """
+    Return the async engine, creating it on first call.
+    
+    Same database and pool settings as get_engine(), driven by asyncpg
+    (DATABASE_URL stays a plain postgresql:// URL; we swap the driver here).
+    
+    asyncpg connection arguments:
+    statement_cache_size: asyncpg's own LRU of prepared statements
+    prepared_statement_cache_size: SQLAlchemy's per-connection cache on top of it,
+      so repeated queries skip Parse and go straight to Bind + Execute
+    """
+    connect_args = {
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    }
+    if settings.DB_DISABLE_JIT:
+        connect_args["server_settings"] = {"jit": "off"}
+    
+    return create_async_engine(
+        make_url(settings.DATABASE_URL).set(drivername="postgresql+asyncpg"),
+        pool_pre_ping=True,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_use_lifo=True,
+        connect_args=connect_args,
+    )
+
+
+@cache
+def get_async_session_factory() -> async_sessionmaker:
+    """
+    Return the async session factory (bound to get_async_engine()).
+    
+    expire_on_commit=False: objects stay readable after commit without an implicit
+    (and, in async code, illegal) lazy refresh
+    """
+    return async_sessionmaker(get_async_engine(), autoflush=False, expire_on_commit=False)
+
+
+async def dispose_engines() -> None:
+    """Close pooled connections of whichever engines were actually created."""
+    if get_async_engine.cache_info().currsize:
+        await get_async_engine().dispose()
+    if get_engine.cache_info().currsize:
+        get_engine().dispose()
 
 # Base: all our ORM models will inherit from this
 Base = declarative_base()
@@ -52,3 +138,19 @@ def get_db():
     finally:
         db.close()
 
+
+
+async def get_async_db():
+    """
+    Dependency that provides an async database session.
+    
+    Usage in routes:
+        @app.get("/items")
+        async def get_items(db: AsyncSession = Depends(get_async_db)):
+            result = await db.execute(select(Item))
+            return result.scalars().all()
+    
+    The session is automatically closed after the request completes.
+    """
+    async with get_async_session_factory()() as db:
+        yield db
@@ -11,9 +11,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 
-from app.database import engine, Base
+from app.database import get_engine, dispose_engines, Base
 from app.routers import transactions, insights, query, auth
-from app.config import settings
 
 
 # Lifespan context manager: runs on startup and shutdown
@@ -21,9 +20,10 @@ from app.config import settings
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: create database tables
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=get_engine())
     yield
-    # Shutdown: cleanup if needed (currently none)
+    # Shutdown: close pooled connections while the event loop is still running
+    await dispose_engines()
 
 
 # Initialize FastAPI app with metadata
@@ -42,7 +42,8 @@ is_dev = os.getenv("ENVIRONMENT", "development") == "development"
 # Allow all localhost ports in development, specific origins in production
 if is_dev:
     # In development, use regex pattern to match any localhost port
-    # FastAPI CORS supports this via allow_origin_regex
+    # FastAPI CORS supports this via allow_origin_regex (compiled once at startup,
+    # then checked with a single fullmatch per request)
     app.add_middleware(
         CORSMiddleware,
         allow_origin_regex=r"http://(localhost|127\.0\.0\.1):\d+",
@@ -53,7 +54,10 @@ if is_dev:
     )
 else:
     # In production, use specific allowed origins from environment
-    allowed_origins = os.getenv("ALLOWED_ORIGINS", "").split(",")
+    # A frozenset keeps the per-request origin check O(1) however many are configured
+    allowed_origins = frozenset(
+        origin.strip() for origin in os.getenv("ALLOWED_ORIGINS", "").split(",") if origin.strip()
+    )
     app.add_middleware(
         CORSMiddleware,
         allow_origins=allowed_origins,
@@ -5,29 +5,105 @@ These models represent our database tables. SQLAlchemy automatically converts
 Python classes to SQL tables and Python objects to database rows.
 
 Design decisions:
-- Use Decimal for money (avoids floating-point precision issues)
+- Store money as integer cents (BigInteger): exact like Decimal, but sums and
+  comparisons use native 64-bit integer math in both PostgreSQL and Python.
+  Each *_cents column has a Decimal-valued hybrid property (amount, balance,
+  limit, spent) so the API and callers keep working in dollars.
 - Index frequently queried fields (user_id, date) for performance
+- No index=True on primary keys (PostgreSQL already backs every PK with a
+  unique index) or on columns that lead a composite index; each extra
+  btree is another write on every insert
 - Use relationships for foreign keys (SQLAlchemy handles joins automatically)
 - Timestamps track when records are created/updated
 """
 
-from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey, Boolean, Text, Index
-from sqlalchemy.orm import relationship
+import hashlib
+
+from sqlalchemy import Column, Integer, BigInteger, String, Numeric, DateTime, ForeignKey, Boolean, Text, Index, cast, text
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
-from decimal import Decimal
-from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Optional, Tuple
 
 from app.database import Base
 
 
+def to_cents(amount) -> int:
+    """Convert a dollar amount (Decimal, str, int or float) to integer cents."""
+    return int(Decimal(str(amount)).scaleb(2).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents: Optional[int]) -> Optional[Decimal]:
+    """Convert integer cents back to a 2-decimal-place Decimal (e.g. -550 -> -5.50)."""
+    if cents is None:
+        return None
+    return Decimal(cents).scaleb(-2)
+
+
+def transaction_dedup_hash(date: datetime, amount_cents: int, description: str, occurrence: int = 0) -> int:
+    """
+    Duplicate-detection key of an imported transaction: a 64-bit BLAKE2b
+    digest of its date, amount and description, as a signed integer (fits
+    BIGINT).
+    
+    occurrence numbers identical rows within one CSV file (0 for the first,
+    1 for the second, ...), so two genuine identical charges on one day
+    (two coffees) stay two transactions, while re-importing the same file
+    maps each row back onto the transaction it created. The first
+    occurrence hashes exactly as it did before occurrences existed.
+    
+    The unique index is on (account_id, dedup_hash) instead of the
+    (timestamp, bigint, varchar) columns themselves: a fixed 8-byte key
+    makes the index a fraction of the size and each probe a single integer
+    comparison. The date is hashed as its UTC instant; naive datetimes are
+    taken to be UTC (the database session's default time zone).
+    
+    Example: every re-import of the same CSV row produces the same hash
+    """
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    else:
+        date = date.astimezone(timezone.utc)
+    raw = f"{date.isoformat()}|{amount_cents}|{description}"
+    if occurrence:
+        raw += f"|{occurrence}"
+    return int.from_bytes(hashlib.blake2b(raw.encode(), digest_size=8).digest(), "big", signed=True)
+
+
+@lru_cache(maxsize=256)
+def month_bounds(year: int, month: int) -> Tuple[datetime, datetime]:
+    """
+    Return [start, end) for filtering Transaction.date by calendar month:
+    the first instant of the month and the first instant of the next month.
+    
+    Filter with date >= start AND date < end rather than extract(month/year),
+    which hides the column from the (user_id, date) index.
+    
+    Example: month_bounds(2024, 12) -> (2024-12-01 00:00, 2025-01-01 00:00)
+    """
+    start = datetime(year, month, 1)
+    end = datetime(year + month // 12, month % 12 + 1, 1)
+    return start, end
+
+
+def _dollars_sql(cents_column):
+    """SQL expression for a cents column in dollars (for ad-hoc queries only;
+    filters and aggregates should use the *_cents column directly)."""
+    return cast(cents_column / 100, Numeric(12, 2))
+
+
 class User(Base):
     """
     User model: stores authentication and profile information.
     
     Fields:
     - id: Primary key (auto-incrementing integer)
-    - email: Unique email address (used for login)
-    - hashed_password: Bcrypt-hashed password (never store plain text!)
+    - email: Unique email address (used for login), stored lowercased;
+      uniqueness is enforced by a unique index on lower(email)
+    - hashed_password: Argon2id-hashed password (never store plain text!)
     - full_name: User's display name
     - created_at: Timestamp when account was created
     - is_active: Soft delete flag (can disable accounts without deleting)
@@ -40,19 +116,32 @@ class User(Base):
     """
     __tablename__ = "users"
     
-    id = Column(Integer, primary_key=True, index=True)
-    email = Column(String, unique=True, index=True, nullable=False)
+    id = Column(Integer, primary_key=True)
+    email = Column(String, nullable=False)
     hashed_password = Column(String, nullable=False)
     full_name = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     is_active = Column(Boolean, default=True)
     
     # Relationships: SQLAlchemy automatically creates these
-    # lazy="dynamic" means we get a query object, not a list (better for large datasets)
-    accounts = relationship("Account", back_populates="user", cascade="all, delete-orphan")
-    transactions = relationship("Transaction", back_populates="user", cascade="all, delete-orphan")
-    budgets = relationship("Budget", back_populates="user", cascade="all, delete-orphan")
-    rules = relationship("Rule", back_populates="user", cascade="all, delete-orphan")
+    # Collections raise instead of lazy-loading: touching user.transactions
+    # without selectinload()/joinedload() would silently fire one SELECT per
+    # user (N+1), so it fails loudly instead
+    accounts = relationship("Account", back_populates="user", cascade="all, delete-orphan", lazy="raise_on_sql")
+    transactions = relationship("Transaction", back_populates="user", cascade="all, delete-orphan", lazy="raise_on_sql")
+    budgets = relationship("Budget", back_populates="user", cascade="all, delete-orphan", lazy="raise_on_sql")
+    rules = relationship("Rule", back_populates="user", cascade="all, delete-orphan", lazy="raise_on_sql")
+    
+    # Case-insensitive unique index: lookups written as
+    # func.lower(User.email) == email.lower() are an index scan, not a seq scan
+    __table_args__ = (
+        Index("ix_users_email_lower", func.lower(email), unique=True),
+    )
+    
+    @validates("email")
+    def _normalize_email(self, key, value):
+        """Store emails lowercased so the same address can't register twice."""
+        return value.strip().lower() if value is not None else value
 
 
 class Account(Base):
@@ -67,21 +156,33 @@ class Account(Base):
     - user_id: Foreign key to users table
     - name: Account nickname (e.g., "Chase Checking")
     - account_type: Type of account (checking, savings, credit_card, etc.)
-    - balance: Current account balance (updated when transactions are added)
+    - balance_cents: Current account balance in cents (updated when transactions are added)
     - created_at: When account was added
     """
     __tablename__ = "accounts"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     name = Column(String, nullable=False)
     account_type = Column(String, nullable=False)  # checking, savings, credit_card, etc.
-    balance = Column(Numeric(10, 2), default=Decimal("0.00"))  # 10 digits total, 2 decimal places
+    balance_cents = Column(BigInteger, nullable=False, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
+    @hybrid_property
+    def balance(self) -> Optional[Decimal]:
+        return from_cents(self.balance_cents)
+    
+    @balance.setter
+    def balance(self, value):
+        self.balance_cents = to_cents(value)
+    
+    @balance.expression
+    def balance(cls):
+        return _dollars_sql(cls.balance_cents)
+    
     # Relationships
     user = relationship("User", back_populates="accounts")
-    transactions = relationship("Transaction", back_populates="account", cascade="all, delete-orphan")
+    transactions = relationship("Transaction", back_populates="account", cascade="all, delete-orphan", lazy="raise_on_sql")
 
 
 class Category(Base):
@@ -99,14 +200,14 @@ class Category(Base):
     """
     __tablename__ = "categories"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String, unique=True, nullable=False)
     color = Column(String, default="#6B7280")  # Default gray
     icon = Column(String, nullable=True)
     
     # Relationships
-    transactions = relationship("Transaction", back_populates="category")
-    budgets = relationship("Budget", back_populates="category")
+    transactions = relationship("Transaction", back_populates="category", lazy="raise_on_sql")
+    budgets = relationship("Budget", back_populates="category", lazy="raise_on_sql")
 
 
 class Transaction(Base):
@@ -123,32 +224,60 @@ class Transaction(Base):
     - category_id: Foreign key to categories (can be null if uncategorized)
     - date: Transaction date (when the transaction occurred)
     - description: Transaction description from bank statement
-    - amount: Transaction amount (negative for expenses, positive for income)
+    - amount_cents: Transaction amount in cents (negative for expenses, positive for income)
     - transaction_type: Type (debit, credit, transfer)
+    - dedup_hash: Identity of the CSV row it was imported from (NULL if
+      entered manually); kept as-is when the transaction is edited, so
+      re-importing that row still finds it
     - is_categorized: Boolean flag (true if category_id is set)
     - created_at: When transaction was imported
     - updated_at: When transaction was last modified (e.g., categorized)
     
     Indexes:
     - Composite index on (user_id, date) for fast date range queries
+    - Unique index on (account_id, dedup_hash): the duplicate check for CSV
+      imports (dedup_hash digests date + amount + description); it also
+      serves account_id lookups, so account_id has no index of its own
+    - Covering index on (user_id, date, category_id) INCLUDE (amount_cents)
+      for per-category sums within a date range
+    - Index on (user_id, category_id, date) for the category-filtered list
+    - Partial index on (user_id, id) WHERE NOT is_categorized for
+      finding transactions that still need a category
     - Index on category_id for filtering by category
     """
     __tablename__ = "transactions"
     
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
-    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False, index=True)
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)  # Leading column of idx_user_date
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False)  # Leading column of uq_transactions_dedup
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=True, index=True)
     
     date = Column(DateTime(timezone=True), nullable=False, index=True)
     description = Column(String, nullable=False)
-    amount = Column(Numeric(10, 2), nullable=False)  # Negative = expense, Positive = income
+    amount_cents = Column(BigInteger, nullable=False)  # Negative = expense, Positive = income
     transaction_type = Column(String, nullable=False)  # debit, credit, transfer
+    # transaction_dedup_hash(...) of the CSV row a transaction was imported
+    # from, set by the upload's upsert. NULL for manually entered
+    # transactions: unique indexes never treat NULLs as equal, so those
+    # bypass duplicate detection (an identical manual entry is allowed)
+    dedup_hash = Column(BigInteger, nullable=True)
     
     is_categorized = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    @hybrid_property
+    def amount(self) -> Optional[Decimal]:
+        return from_cents(self.amount_cents)
+    
+    @amount.setter
+    def amount(self, value):
+        self.amount_cents = to_cents(value)
+    
+    @amount.expression
+    def amount(cls):
+        return _dollars_sql(cls.amount_cents)
+    
     # Relationships
     user = relationship("User", back_populates="transactions")
     account = relationship("Account", back_populates="transactions")
@@ -157,6 +286,30 @@ class Transaction(Base):
     # Composite index: speeds up queries like "get all transactions for user X in date range Y"
     __table_args__ = (
         Index("idx_user_date", "user_id", "date"),
+        # Duplicate detection: CSV uploads upsert against this
+        # (INSERT ... ON CONFLICT DO UPDATE), so a re-imported row updates the
+        # existing one instead of being inserted twice (manual entries have
+        # a NULL dedup_hash and never conflict)
+        Index("uq_transactions_dedup", "account_id", "dedup_hash", unique=True),
+        # Covering index (PG 11+): "user X, date range Y, category Z" sums read
+        # amount_cents straight from the index leaf with an index-only scan,
+        # instead of bitmap-ANDing idx_user_date with the category_id index
+        # and then fetching heap pages.
+        Index(
+            "idx_user_date_cat", "user_id", "date", "category_id",
+            postgresql_include=["amount_cents"],
+        ),
+        # Transaction list filtered by category, newest first: equality on
+        # both leading columns, then rows come back already in date order
+        Index("idx_user_cat_date", "user_id", "category_id", "date"),
+        # "Uncategorized transactions of user X", walked in id order a page at
+        # a time (keyset pagination in POST /categorize): a partial index only
+        # holds the rows still waiting for a category, so it stays tiny and
+        # hot however long the user's history gets
+        Index(
+            "idx_user_uncategorized", "user_id", "id",
+            postgresql_where=text("is_categorized = false"),
+        ),
     )
 
 
@@ -173,23 +326,47 @@ class Budget(Base):
     - category_id: Foreign key to categories (which category this budget is for)
     - month: Month (1-12)
     - year: Year (e.g., 2024)
-    - limit: Budget limit (maximum amount to spend)
-    - spent: Current amount spent (calculated from transactions)
+    - limit_cents: Budget limit in cents (maximum amount to spend)
+    - spent_cents: Current amount spent in cents (calculated from transactions)
     - created_at: When budget was created
     
     Unique constraint: one budget per user/category/month/year combination
     """
     __tablename__ = "budgets"
     
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)  # Leading column of idx_user_category_month_year
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
     month = Column(Integer, nullable=False)  # 1-12
     year = Column(Integer, nullable=False)
-    limit = Column(Numeric(10, 2), nullable=False)
-    spent = Column(Numeric(10, 2), default=Decimal("0.00"))  # Calculated from transactions
+    limit_cents = Column(BigInteger, nullable=False)
+    spent_cents = Column(BigInteger, nullable=False, default=0)  # Calculated from transactions
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
+    @hybrid_property
+    def limit(self) -> Optional[Decimal]:
+        return from_cents(self.limit_cents)
+    
+    @limit.setter
+    def limit(self, value):
+        self.limit_cents = to_cents(value)
+    
+    @limit.expression
+    def limit(cls):
+        return _dollars_sql(cls.limit_cents)
+    
+    @hybrid_property
+    def spent(self) -> Optional[Decimal]:
+        return from_cents(self.spent_cents)
+    
+    @spent.setter
+    def spent(self, value):
+        self.spent_cents = to_cents(value)
+    
+    @spent.expression
+    def spent(cls):
+        return _dollars_sql(cls.spent_cents)
+    
     # Relationships
     user = relationship("User", back_populates="budgets")
     category = relationship("Category", back_populates="budgets")
@@ -221,7 +398,7 @@ class Rule(Base):
     """
     __tablename__ = "rules"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
     pattern = Column(String, nullable=False)  # Pattern to match
@@ -234,3 +411,24 @@ class Rule(Base):
     user = relationship("User", back_populates="rules")
     category = relationship("Category")
 
+
+class CategoryCache(Base):
+    """
+    CategoryCache model: remembered AI categorizations.
+    
+    The AI's answer only depends on the description and the set of
+    categories, and bank descriptions repeat constantly with only store
+    numbers/dates changing ("STARBUCKS STORE #1234" vs "#5678"). Answers are
+    stored under a hash of the normalized description (see
+    ai_service.description_cache_key), so each merchant costs one LLM call.
+    
+    Fields:
+    - hash_key: BLAKE2b hex digest of the normalized description + category set
+    - category_id: Foreign key to categories (the AI's answer)
+    - created_at: When the answer was cached
+    """
+    __tablename__ = "category_cache"
+    
+    hash_key = Column(String(32), primary_key=True)
+    category_id = Column(Integer, ForeignKey("categories.id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -2,10 +2,14 @@
 Authentication router: handles user registration and login.
 
 Endpoints:
-- POST /api/auth/register: Create a new user account
+- POST /api/auth/register: Create a new user account (only when OPEN_ACCESS is off)
 - POST /api/auth/login: Authenticate user and return JWT token
 - GET /api/auth/me: Get current user information (protected)
 
+With OPEN_ACCESS on (the default) every route acts as the shared default
+user; app.auth.current_user_dep (claims) and current_user_orm_dep (the
+User row, for /me) pick the right dependency either way.
+
 Flow:
 1. User registers → password is hashed and stored
 2. User logs in → password verified, JWT token issued
@@ -14,24 +18,76 @@ Flow:
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import exists, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
-from app.models import User
+from app.database import get_async_db
+from app.config import settings
+from app.models import Account, User
 from app.schemas import UserCreate, UserResponse, Token
-from app.auth import get_password_hash, verify_password, create_access_token, get_default_user
+from app.auth import (
+    get_password_hash, verify_password, verify_password_for_missing_user, password_needs_rehash,
+    create_access_token, current_user_orm_dep
+)
 
 router = APIRouter()
 
 
-# Register route disabled for open access
-# @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-# def register(user_data: UserCreate, db: Session = Depends(get_db)):
-#     ... (disabled)
+# Registration only makes sense when users log in; in open-access mode the
+# route isn't registered at all
+if not settings.OPEN_ACCESS:
+    @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+    async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
+        """
+        Create a new user account.
+        
+        Process:
+        1. Reject the email if it's already registered (case-insensitive)
+        2. Hash the password (Argon2id, on the hashing thread pool)
+        3. Create the user and their default account
+        
+        Example request:
+            POST /api/auth/register
+            {
+                "email": "user@example.com",
+                "password": "securepassword123",
+                "full_name": "Jane Doe"
+            }
+        """
+        email = user_data.email.strip().lower()
+        
+        # EXISTS on lower(email) uses ix_users_email_lower and returns one boolean
+        if await db.scalar(select(exists().where(func.lower(User.email) == email))):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Email already registered"
+            )
+        
+        user = User(
+            email=email,
+            hashed_password=await get_password_hash(user_data.password),
+            full_name=user_data.full_name,
+            is_active=True
+        )
+        db.add(user)
+        try:
+            await db.flush()  # Get the user ID for the default account
+            db.add(Account(user_id=user.id, name="Default Account", account_type="checking", balance=0.00))
+            await db.commit()
+        except IntegrityError:
+            # Lost a race with a concurrent registration of the same email
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Email already registered"
+            )
+        
+        return user
 
 
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
     """
     Authenticate user and return JWT token.
     
@@ -42,8 +98,9 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     Process:
     1. Find user by email
     2. Verify password against stored hash
-    3. Generate JWT token with user ID
-    4. Return token (client stores this and sends in Authorization header)
+    3. Upgrade the stored hash if it's legacy bcrypt or uses old Argon2 parameters
+    4. Generate JWT token with user ID, email and active flag
+    5. Return token (client stores this and sends in Authorization header)
     
     Example request:
         POST /api/auth/login
@@ -58,10 +115,23 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
         }
     """
     # Find user by email (OAuth2PasswordRequestForm uses "username" field for email)
-    user = db.query(User).filter(User.email == form_data.username).first()
+    # Async session: the lookup and the rehash commit are awaited on the event
+    # loop, and only the password hash itself goes to the hashing thread pool
+    # Emails are stored lowercased; matching on lower(email) uses ix_users_email_lower
+    result = await db.execute(
+        select(User).where(func.lower(User.email) == form_data.username.strip().lower())
+    )
+    user = result.scalar_one_or_none()
     
     # Verify user exists and password is correct
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    # Unknown emails still pay for one (dummy) hash check, so response time
+    # doesn't reveal whether an account exists
+    if user is None:
+        password_ok = await verify_password_for_missing_user(form_data.password)
+    else:
+        password_ok = await verify_password(form_data.password, user.hashed_password)
+    
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -75,17 +145,27 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
             detail="User account is inactive"
         )
     
+    # Transparently upgrade the stored hash while we have the plain password
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = await get_password_hash(form_data.password)
+        await db.commit()
+    
     # Create access token
-    # "sub" (subject) is the standard JWT claim for user identifier
-    access_token = create_access_token(data={"sub": user.id, "email": user.email})
+    # "sub" (subject) is the standard JWT claim for user identifier; the spec
+    # requires a string, so the id is stringified once here and parsed back
+    # with int() when the token is verified
+    # "active" lets protected routes skip the users lookup for the token's lifetime
+    access_token = create_access_token(
+        data={"sub": str(user.id), "email": user.email, "active": user.is_active}
+    )
     
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.get("/me", response_model=UserResponse)
-def get_me(current_user: User = Depends(get_default_user)):
+def get_me(current_user: User = Depends(current_user_orm_dep)):
     """
-    Get current user information (default user for open access).
+    Get current user information (the default user in open-access mode).
     
     Example request:
         GET /api/auth/me
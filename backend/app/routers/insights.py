@@ -11,28 +11,134 @@ Monthly insights include:
 - Top expenses
 - Budget status (spent vs. limit)
 - AI-generated summary
+
+Responses carry a weak ETag derived from the month's data version, so a
+polling dashboard gets a 304 Not Modified while nothing has changed.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+import hashlib
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from sqlalchemy import and_, bindparam, func, case, cast, desc, select, true, BigInteger
 from typing import List
-from decimal import Decimal
+from datetime import date
 
 from app.database import get_db
-from app.models import Transaction, Budget, Category, User
+from app.models import Transaction, Budget, Category, month_bounds
 from app.schemas import MonthlyInsightsResponse
-from app.auth import get_default_user as get_current_user
+from app.auth import UserClaims, current_user_dep
 from app.services.ai_service import generate_monthly_summary
+from app.services.cache import cache_get, cache_set, insights_cache_key
+from app.config import settings
 
 router = APIRouter()
 
+# Insights queries, built once at import with bind parameters so every request
+# reuses the same statement objects (and SQLAlchemy's compiled-SQL cache)
+# instead of rebuilding the expression tree per call.
+# The month filter is a half-open date range instead of extract(month/year):
+# a plain range on the column lets PostgreSQL use the (user_id, date) index.
+_in_month = and_(
+    Transaction.user_id == bindparam("user_id"),
+    Transaction.date >= bindparam("start"),
+    Transaction.date < bindparam("end")
+)
+
+# Everything the monthly response depends on, summarized in one row for the
+# ETag: count + last change of the month's transactions (a delete changes the
+# count, an edit bumps updated_at) and the month's budget amounts (budgets
+# have no updated_at, so their values are part of the version directly)
+_tx_version = select(
+    func.count(Transaction.id).label("tx_count"),
+    func.max(func.coalesce(Transaction.updated_at, Transaction.created_at)).label("tx_changed")
+).where(_in_month).subquery()
+
+_budget_version = select(
+    func.count(Budget.id).label("budget_count"),
+    func.sum(Budget.limit_cents).label("budget_limit"),
+    func.sum(Budget.spent_cents).label("budget_spent"),
+    func.max(Budget.created_at).label("budget_created")
+).where(
+    Budget.user_id == bindparam("user_id"),
+    Budget.month == bindparam("month"),
+    Budget.year == bindparam("year")
+).subquery()
+
+_VERSION_STMT = select(_tx_version, _budget_version).select_from(
+    _tx_version.join(_budget_version, true())
+)
+
+# Count + income + expenses in one row
+# (SUM over BIGINT returns NUMERIC in PostgreSQL, so cast back to cents)
+_TOTALS_STMT = select(
+    func.count(Transaction.id),
+    cast(func.coalesce(func.sum(case((Transaction.amount_cents > 0, Transaction.amount_cents))), 0), BigInteger),
+    cast(func.coalesce(func.sum(case((Transaction.amount_cents < 0, -Transaction.amount_cents))), 0), BigInteger),
+).where(_in_month)
+
+# Expenses summed per category, largest first
+_CATEGORY_TOTALS_STMT = select(
+    Category.name,
+    cast(func.sum(-Transaction.amount_cents), BigInteger).label("total_cents")
+).join(
+    Category, Transaction.category_id == Category.id
+).where(
+    _in_month,
+    Transaction.amount_cents < 0  # Only expenses
+).group_by(Category.name).order_by(desc("total_cents"), Category.name)
+
+# Ten largest expenses: most negative amounts first
+_TOP_EXPENSES_STMT = select(
+    Transaction.description, Transaction.amount_cents, Transaction.date
+).where(
+    _in_month,
+    Transaction.amount_cents < 0
+).order_by(Transaction.amount_cents, Transaction.id).limit(10)
 
-@router.get("/monthly", response_model=MonthlyInsightsResponse)
+# Each budget's amounts with its category name in one JOIN (instead of a
+# category lookup per budget); the inner join also skips budgets whose
+# category no longer exists
+_BUDGETS_STMT = select(
+    Budget.limit_cents, Budget.spent_cents, Category.name
+).join(
+    Category, Budget.category_id == Category.id
+).where(
+    Budget.user_id == bindparam("user_id"),
+    Budget.month == bindparam("month"),
+    Budget.year == bindparam("year")
+)
+
+
+def _insights_etag(user_id: int, year: int, month: int, version: tuple) -> str:
+    """Weak ETag for one user's month: a short BLAKE2b digest of its data version."""
+    raw = f"{user_id}:{year}:{month}:" + ":".join(str(value) for value in version)
+    return 'W/"' + hashlib.blake2b(raw.encode(), digest_size=16).hexdigest() + '"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an If-None-Match header ("*" or a comma-separated ETag list)."""
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/"x" and "x" name the same version
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+# The payload is built as a plain dict and encoded by orjson directly: no
+# response_model validation/serialization pass on the way out.
+# MonthlyInsightsResponse is still listed so the OpenAPI docs keep the schema.
+@router.get(
+    "/monthly",
+    response_class=ORJSONResponse,
+    responses={200: {"model": MonthlyInsightsResponse}}
+)
 def get_monthly_insights(
+    request: Request,
     month: int = Query(..., ge=1, le=12, description="Month (1-12)"),
     year: int = Query(..., ge=2000, le=2100, description="Year"),
-    current_user: User = Depends(get_current_user),
+    current_user: UserClaims = Depends(current_user_dep),
     db: Session = Depends(get_db)
 ):
     """
@@ -70,89 +176,110 @@ def get_monthly_insights(
             ],
             "ai_summary": "In September 2024, you earned $5,000 and spent $3,200..."
         }
+    
+    Responses are cached per (user, year, month) together with the ETag they
+    were built under, and invalidated whenever the user's transactions
+    change, so repeat views skip the queries and the OpenAI call. A cached
+    body whose ETag no longer matches the current data version is rebuilt,
+    so a worker whose local cache missed an invalidation never serves it.
+    
+    The ETag changes whenever the month's transactions or budgets do; a
+    request whose If-None-Match still matches gets an empty 304 after one
+    small version query, skipping the aggregation and AI summary entirely.
     """
-    # Query transactions for the month
-    transactions = db.query(Transaction).filter(
-        and_(
-            Transaction.user_id == current_user.id,
-            func.extract('month', Transaction.date) == month,
-            func.extract('year', Transaction.date) == year
-        )
-    ).all()
+    start, end = month_bounds(year, month)
+    params = {"user_id": current_user.id, "start": start, "end": end}
+    
+    # Conditional request: nothing changed since the client's copy
+    version = db.execute(_VERSION_STMT, {**params, "month": month, "year": year}).one()
+    etag = _insights_etag(current_user.id, year, month, tuple(version))
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
     
-    if not transactions:
+    # The cached body is only used if it was built from the data version
+    # we just read: with several workers and the in-process cache, another
+    # worker's write invalidates only its own cache, so an entry here can
+    # predate it (and must not go out under the new ETag)
+    cache_key = insights_cache_key(current_user.id, year, month)
+    cached = cache_get(cache_key)
+    if cached is not None and cached.get("etag") == etag:
+        return ORJSONResponse(cached["body"], headers={"ETag": etag})
+    
+    # Totals: one aggregate row instead of loading every transaction
+    transaction_count, income_cents, expense_cents = db.execute(_TOTALS_STMT, params).one()
+    
+    if not transaction_count:
         raise HTTPException(
             status_code=404,
             detail=f"No transactions found for {month}/{year}"
         )
     
-    # Calculate totals
-    total_income = sum(t.amount for t in transactions if t.amount > 0)
-    total_expenses = abs(sum(t.amount for t in transactions if t.amount < 0))
-    net_income = total_income - total_expenses
+    # All arithmetic stays in integer cents; dollars only at the response edge
+    net_cents = income_cents - expense_cents
     
-    # Category breakdown
-    category_totals = {}
-    for t in transactions:
-        if t.category and t.amount < 0:  # Only expenses
-            cat_name = t.category.name
-            amount = abs(t.amount)
-            category_totals[cat_name] = category_totals.get(cat_name, Decimal("0")) + amount
+    # Category breakdown: expenses summed per category, largest first
+    category_totals = db.execute(_CATEGORY_TOTALS_STMT, params).all()
     
     # Calculate percentages
     category_breakdown = []
-    for cat_name, amount in sorted(category_totals.items(), key=lambda x: x[1], reverse=True):
-        percentage = (amount / total_expenses * 100) if total_expenses > 0 else 0
+    for cat_name, amount_cents in category_totals:
+        percentage = (amount_cents / expense_cents * 100) if expense_cents > 0 else 0
         category_breakdown.append({
             "category_name": cat_name,
-            "amount": float(amount),
+            "amount": amount_cents / 100,
             "percentage": round(float(percentage), 2)
         })
     
     # Top expenses (largest expenses)
-    expenses = [t for t in transactions if t.amount < 0]
-    expenses.sort(key=lambda x: abs(x.amount), reverse=True)
     top_expenses = [
         {
-            "description": t.description,
-            "amount": float(abs(t.amount)),
-            "date": t.date.isoformat()
+            "description": description,
+            "amount": -amount_cents / 100,
+            "date": when.isoformat()
         }
-        for t in expenses[:10]  # Top 10
+        for description, amount_cents, when in db.execute(_TOP_EXPENSES_STMT, params)
     ]
     
     # Budget status
-    budgets = db.query(Budget).filter(
-        and_(
-            Budget.user_id == current_user.id,
-            Budget.month == month,
-            Budget.year == year
-        )
+    budgets = db.execute(
+        _BUDGETS_STMT, {"user_id": current_user.id, "month": month, "year": year}
     ).all()
     
-    budget_status = []
-    for budget in budgets:
-        category = db.query(Category).filter(Category.id == budget.category_id).first()
-        if category:
-            budget_status.append({
-                "category_name": category.name,
-                "limit": float(budget.limit),
-                "spent": float(budget.spent),
-                "remaining": float(budget.limit - budget.spent)
-            })
-    
-    # Generate AI summary
-    ai_summary = generate_monthly_summary(month, year, current_user.id, db)
-    
-    return MonthlyInsightsResponse(
-        month=month,
-        year=year,
-        total_income=Decimal(str(total_income)),
-        total_expenses=Decimal(str(total_expenses)),
-        net_income=Decimal(str(net_income)),
-        category_breakdown=category_breakdown,
-        top_expenses=top_expenses,
-        budget_status=budget_status,
-        ai_summary=ai_summary
+    budget_status = [
+        {
+            "category_name": category_name,
+            "limit": limit_cents / 100,
+            "spent": spent_cents / 100,
+            "remaining": (limit_cents - spent_cents) / 100
+        }
+        for limit_cents, spent_cents, category_name in budgets
+    ]
+    
+    # Generate AI summary (reusing the aggregates above, so no extra queries)
+    ai_summary = generate_monthly_summary(
+        month, year, current_user.id, db,
+        totals=(transaction_count, income_cents, expense_cents),
+        category_totals=category_totals
     )
+    
+    response = {
+        "month": month,
+        "year": year,
+        "total_income": income_cents / 100,
+        "total_expenses": expense_cents / 100,
+        "net_income": net_cents / 100,
+        "category_breakdown": category_breakdown,
+        "top_expenses": top_expenses,
+        "budget_status": budget_status,
+        "ai_summary": ai_summary
+    }
+    
+    # The current month is still filling up, so keep it only briefly
+    today = date.today()
+    is_current_month = (year, month) == (today.year, today.month)
+    ttl = settings.INSIGHTS_CACHE_TTL_CURRENT_MONTH if is_current_month else settings.INSIGHTS_CACHE_TTL
+    cache_set(cache_key, {"etag": etag, "body": response}, ttl)
+    
+    return ORJSONResponse(response, headers={"ETag": etag})
 
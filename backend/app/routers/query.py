@@ -16,38 +16,98 @@ Note: This is an advanced feature requiring careful prompt engineering
 to prevent SQL injection and ensure accurate queries.
 """
 
+import importlib.util
+import logging
+import threading
+
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
-from app.database import get_db, engine
-from app.models import User
+from app.database import get_db, get_engine
 from app.schemas import NaturalLanguageQuery, QueryResponse
-from app.auth import get_default_user as get_current_user
+from app.auth import UserClaims, current_user_dep
 from app.config import settings
+from app.services.nl_templates import answer_from_template
 
 # Lazy import of LangChain - only import if needed
-try:
-    from langchain.agents import create_sql_agent
-    from langchain.agents.agent_toolkits import create_sql_agent as create_sql_agent_toolkit
-    from langchain.sql_database import SQLDatabase
-    from langchain_openai import ChatOpenAI
-    LANGCHAIN_AVAILABLE = True
-except ImportError:
-    LANGCHAIN_AVAILABLE = False
+# Importing the agent toolkit takes seconds and most questions are answered
+# by templates, so at startup we only check that the packages are installed;
+# _get_agent() imports them when the agent is first built
+LANGCHAIN_AVAILABLE = all(
+    importlib.util.find_spec(name) is not None for name in ("langchain", "langchain_openai")
+)
+
+MISSING_LANGCHAIN_DETAIL = (
+    "AI query feature is not available due to missing dependencies. Please check LangChain installation."
+)
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Agent singletons, built on first use and shared by every request:
+# SQLDatabase reflects every table when created and the agent wraps it with
+# the LLM, so building them per request costs catalog queries each time.
+# The route is a sync def (run in FastAPI's threadpool), hence a thread lock.
+_agent = None
+_agent_lock = threading.Lock()
+
+
+def _get_agent():
+    """Return the shared LangChain SQL agent, creating it on first call."""
+    global _agent
+    if _agent is not None:
+        return _agent
+    
+    with _agent_lock:
+        if _agent is None:
+            from langchain.agents import create_sql_agent
+            from langchain.agents.agent_toolkits import create_sql_agent as create_sql_agent_toolkit
+            from langchain.sql_database import SQLDatabase
+            from langchain_openai import ChatOpenAI
+            
+            # Create SQL database connection
+            # We use the same engine but could create a read-only connection
+            sql_db = SQLDatabase(get_engine())
+            
+            # Initialize LLM
+            llm = ChatOpenAI(
+                model_name="gpt-3.5-turbo",
+                temperature=0,
+                openai_api_key=settings.OPENAI_API_KEY
+            )
+            
+            # Create SQL agent
+            # This agent can understand natural language and generate SQL
+            # Note: LangChain API may vary by version
+            try:
+                agent = create_sql_agent_toolkit(
+                    llm=llm,
+                    db=sql_db,
+                    verbose=settings.DEBUG
+                )
+            except:
+                # Fallback for different LangChain versions
+                agent = create_sql_agent(
+                    llm=llm,
+                    db=sql_db,
+                    verbose=settings.DEBUG
+                )
+            _agent = agent
+    return _agent
 
 
 @router.post("/nl", response_model=QueryResponse)
 def natural_language_query(
     query_data: NaturalLanguageQuery,
-    current_user: User = Depends(get_current_user),
+    current_user: UserClaims = Depends(current_user_dep),
     db: Session = Depends(get_db)
 ):
     """
     Answer natural language questions about finances.
     
-    This uses LangChain's SQL agent to:
+    Common questions ("how much did I spend on food this month?", "total
+    income in 2024") are answered from pre-written SQL templates. Anything
+    else uses LangChain's SQL agent to:
     1. Understand the question
     2. Generate appropriate SQL query
     3. Execute query (scoped to current user's data)
@@ -62,7 +122,7 @@ def natural_language_query(
     Example response:
         {
             "answer": "You spent $450.25 on food this month.",
-            "sql_query": "SELECT SUM(amount) FROM transactions WHERE user_id = 1 AND category_id = 3 AND date >= '2024-09-01'",
+            "sql_query": "SELECT SUM(amount_cents) / 100.0 FROM transactions WHERE user_id = 1 AND category_id = 3 AND date >= '2024-09-01'",
             "data": [{"total": 450.25}]
         }
     
@@ -71,11 +131,14 @@ def natural_language_query(
     - SQL injection protection via parameterized queries
     - Limited to SELECT queries only
     """
+    # Fast path: common question shapes are answered by a parameterized SQL
+    # template without any LLM call (works even without an OpenAI key)
+    templated = answer_from_template(query_data.query, current_user.id, db)
+    if templated is not None:
+        return QueryResponse(**templated)
+    
     if not LANGCHAIN_AVAILABLE:
-        raise HTTPException(
-            status_code=503,
-            detail="AI query feature is not available due to missing dependencies. Please check LangChain installation."
-        )
+        raise HTTPException(status_code=503, detail=MISSING_LANGCHAIN_DETAIL)
     
     if not settings.OPENAI_API_KEY:
         raise HTTPException(
@@ -84,33 +147,7 @@ def natural_language_query(
         )
     
     try:
-        # Create SQL database connection
-        # We use the same engine but could create a read-only connection
-        sql_db = SQLDatabase(engine)
-        
-        # Initialize LLM
-        llm = ChatOpenAI(
-            model_name="gpt-3.5-turbo",
-            temperature=0,
-            openai_api_key=settings.OPENAI_API_KEY
-        )
-        
-        # Create SQL agent
-        # This agent can understand natural language and generate SQL
-        # Note: LangChain API may vary by version
-        try:
-            agent = create_sql_agent_toolkit(
-                llm=llm,
-                db=sql_db,
-                verbose=True
-            )
-        except:
-            # Fallback for different LangChain versions
-            agent = create_sql_agent(
-                llm=llm,
-                db=sql_db,
-                verbose=True
-            )
+        agent = _get_agent()
         
         # Modify query to include user context
         # This ensures all queries are scoped to the current user
@@ -120,6 +157,8 @@ def natural_language_query(
         
         Important: All queries must filter by user_id = {current_user.id}
         Only return data for this user.
+        Money columns (amount_cents, balance_cents, limit_cents, spent_cents) are
+        integer cents: divide by 100 to report dollar amounts.
         """
         
         # Execute agent
@@ -136,11 +175,18 @@ def natural_language_query(
             sql_query=sql_query,
             data=None  # Could extract structured data if needed
         )
-        
-    except Exception as e:
-        # Fallback: return error message
+    
+    except ImportError:
+        # LangChain installed but broken (e.g. incompatible versions)
+        logger.exception("Could not import LangChain")
+        raise HTTPException(status_code=503, detail=MISSING_LANGCHAIN_DETAIL)
+    
+    except Exception:
+        # Fallback: log the full traceback server-side, but don't echo internal
+        # error details (SQL, connection strings, API errors) back to the user
+        logger.exception("Natural language query failed")
         return QueryResponse(
-            answer=f"I encountered an error processing your query: {str(e)}. Please try rephrasing your question.",
+            answer="I encountered an error processing your query. Please try rephrasing your question.",
             sql_query=None,
             data=None
         )
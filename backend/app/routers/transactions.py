@@ -6,42 +6,130 @@ Endpoints:
 - GET /api/transactions: List transactions with filtering
 - POST /api/transactions: Create a single transaction
 - POST /api/transactions/categorize: Apply categorization rules/AI to transactions
+- GET /api/transactions/categorize/status/{task_id}: Status of a background categorization
 - GET /api/transactions/{id}: Get single transaction
 - PUT /api/transactions/{id}: Update transaction (e.g., change category)
 - DELETE /api/transactions/{id}: Delete transaction
 
 Key features:
 - CSV parsing with flexible column detection
-- Duplicate detection (same date + amount + description)
+- Duplicate detection on re-import (same date + amount + description)
 - Batch categorization
 - Filtering and pagination
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query
+import logging
+import os
+
+import orjson
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File, Query
+from fastapi.responses import ORJSONResponse
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
-from typing import List, Optional
+from sqlalchemy import and_, or_, func, literal_column, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import SQLAlchemyError
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
 from app.database import get_db
-from app.models import Transaction, Account, User
+from app.models import Transaction, Account, Category, from_cents, transaction_dedup_hash
 from app.schemas import (
-    TransactionCreate, TransactionResponse, TransactionFilter,
-    TransactionUploadResponse
+    TransactionCreate, TransactionImportRow, TransactionResponse, TransactionFilter,
+    TransactionUploadResponse, CategorizationTaskStatus
 )
-from app.auth import get_default_user as get_current_user
-from app.services.csv_parser import parse_csv_file
+from app.auth import UserClaims, current_user_dep
+from app.services.csv_parser import iter_csv_file
 from app.services.categorization import categorize_batch
+from app.services.cache import invalidate_user_insights
+from app.services.tasks import create_task, get_task_status, run_categorization_task
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Rows parsed and upserted per statement when importing a CSV
+BULK_INSERT_CHUNK_SIZE = 10_000
+
+# Uncategorized transactions loaded and categorized per batch by
+# POST /categorize when no IDs are given
+CATEGORIZE_CHUNK_SIZE = 1000
+
+# An imported row is a duplicate if its account already has a transaction
+# from the same CSV row, i.e. the same dedup_hash (backed by the
+# uq_transactions_dedup index)
+DEDUP_COLUMNS = ["account_id", "dedup_hash"]
+
+
+def _upsert_transactions(
+    db: Session,
+    user_id: int,
+    rows: List[dict],
+    occurrences: Dict[Tuple[datetime, int, str], int]
+) -> Tuple[List[int], int]:
+    """
+    Insert-or-update one chunk of uploaded rows in a single statement.
+    
+    The unique index on (account_id, dedup_hash) is the duplicate check, so
+    there is no separate SELECT and concurrent uploads can't race.
+    xmax = 0 only for freshly inserted row versions, which tells created
+    rows from updated ones in the RETURNING list.
+    
+    Identical rows within one file are numbered (see transaction_dedup_hash's
+    occurrence), so two genuine identical charges are both imported, and a
+    re-import of the file updates each of them instead of adding copies.
+    
+    Args:
+        db: Database session (the caller commits)
+        user_id: Owner of the transactions
+        rows: Validated row dicts (account_id, date, description, amount_cents, transaction_type)
+        occurrences: (date, amount_cents, description) -> times seen so far
+                     in this file; one dict per upload, updated in place
+    
+    Returns:
+        (IDs of newly inserted transactions, number of rows that updated an existing one)
+    """
+    new_ids = []
+    updated_count = 0
+    if not rows:
+        return new_ids, updated_count
+    
+    values = []
+    for row in rows:
+        key = (row["date"], row["amount_cents"], row["description"])
+        occurrence = occurrences.get(key, 0)
+        occurrences[key] = occurrence + 1
+        values.append({
+            "user_id": user_id,
+            "is_categorized": False,
+            "dedup_hash": transaction_dedup_hash(*key, occurrence),
+            **row
+        })
+    
+    stmt = pg_insert(Transaction).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=DEDUP_COLUMNS,
+        set_={"transaction_type": stmt.excluded.transaction_type}
+    ).returning(Transaction.id, (literal_column("xmax") == 0).label("inserted"))
+    
+    for transaction_id, inserted in db.execute(stmt):
+        if inserted:
+            new_ids.append(transaction_id)
+        else:
+            updated_count += 1
+    return new_ids, updated_count
+
 
+# A plain def on purpose: parsing and the (sync) upserts take seconds for a
+# big file, and FastAPI runs def endpoints in its threadpool instead of on
+# the event loop, so other requests keep being served meanwhile
 @router.post("/upload", response_model=TransactionUploadResponse)
-async def upload_transactions(
+def upload_transactions(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     account_id: int = Query(..., description="ID of account to import transactions into"),
     auto_categorize: bool = Query(True, description="Automatically categorize transactions"),
-    current_user: User = Depends(get_current_user),
+    current_user: UserClaims = Depends(current_user_dep),
     db: Session = Depends(get_db)
 ):
     """
@@ -49,11 +137,16 @@ async def upload_transactions(
     
     Process:
     1. Verify account belongs to current user
-    2. Read CSV file content
-    3. Parse CSV into transaction dictionaries
-    4. Check for duplicates (same date + amount + description)
-    5. Insert new transactions
-    6. Optionally categorize transactions
+    2. Stream the CSV from the spooled upload, BULK_INSERT_CHUNK_SIZE rows
+       at a time (never reading the whole file into memory)
+    3. Parse each chunk into transaction dictionaries and validate them
+    4. Upsert each chunk in bulk: rows already imported by an earlier upload
+       (same date + amount + description, and the same position among the
+       file's identical rows) are updated in place by INSERT ... ON CONFLICT,
+       all in one transaction
+    5. Optionally queue categorization of the new rows as a background task
+       (the response doesn't wait for the OpenAI calls; poll
+       /categorize/status/{categorization_task_id} for the outcome)
     
     Example request:
         POST /api/transactions/upload?account_id=1&auto_categorize=true
@@ -64,7 +157,8 @@ async def upload_transactions(
         {
             "transactions_created": 45,
             "transactions_updated": 0,
-            "errors": []
+            "errors": [],
+            "categorization_task_id": "3f2b9c..."
         }
     
     CSV Format:
@@ -102,9 +196,12 @@ async def upload_transactions(
             detail="Please upload a CSV file (.csv extension required)"
         )
     
-    # Read file content
+    # Measure the upload without reading it: it's already spooled to a
+    # temporary file, and the parser streams it from there
     try:
-        content = await file.read()
+        file.file.seek(0, os.SEEK_END)
+        file_size = file.file.tell()
+        file.file.seek(0)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -112,104 +209,177 @@ async def upload_transactions(
         )
     
     # Validate file is not empty
-    if not content or len(content) == 0:
+    if file_size == 0:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="The uploaded file is empty. Please upload a CSV file with transaction data."
         )
     
     # Validate file size (max 10MB)
-    if len(content) > 10 * 1024 * 1024:
+    if file_size > 10 * 1024 * 1024:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="File size exceeds 10MB limit. Please upload a smaller file."
         )
     
-    # Parse CSV
+    # Parse, validate and write the CSV one chunk at a time, so memory stays
+    # O(BULK_INSERT_CHUNK_SIZE) rows however big the file is. Every chunk is
+    # written in the same transaction: a parse error on a later chunk rolls
+    # back the earlier ones too
+    errors = []
+    new_ids = []
+    updated_count = 0
+    transaction_number = 0
+    occurrences = {}  # Numbers identical rows across all chunks of the file
+    
     try:
-        parsed_transactions = parse_csv_file(content, actual_account_id)
+        for parsed_chunk in iter_csv_file(file.file, actual_account_id, BULK_INSERT_CHUNK_SIZE):
+            rows = []
+            for trans_data in parsed_chunk:
+                transaction_number += 1
+                # Pre-validate with the same checks as single creates, so a bad row
+                # is reported up front instead of failing the bulk statement
+                try:
+                    validated = TransactionImportRow.model_validate(trans_data)
+                except ValidationError as e:
+                    errors.append(f"Transaction {transaction_number}: {e.errors()[0]['msg']}")
+                    continue
+                
+                rows.append({
+                    "account_id": actual_account_id,
+                    "date": validated.date,
+                    "description": validated.description,
+                    "amount_cents": validated.amount_cents,
+                    "transaction_type": validated.transaction_type,
+                })
+            
+            inserted_ids, chunk_updated = _upsert_transactions(db, current_user.id, rows, occurrences)
+            new_ids.extend(inserted_ids)
+            updated_count += chunk_updated
+        
+        db.commit()
     except ValueError as e:
-        # ValueError from CSV parser (missing columns, date format, etc.)
+        # ValueError from CSV parser (missing columns, date format, no valid rows, etc.)
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
     except UnicodeDecodeError as e:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"File encoding error: Please ensure your CSV file is saved as UTF-8 encoding. Error: {str(e)}"
         )
-    except Exception as e:
+    except SQLAlchemyError:
+        # Log the full error server-side; the exception text carries the SQL
+        # and bound row values, which shouldn't go back to the client
+        db.rollback()
+        logger.exception("Importing transactions failed (account %s)", actual_account_id)
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Error parsing CSV file: {str(e)}. Please check that your CSV file has the required columns: Date, Description, Amount"
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error importing transactions. Please try again."
         )
-    
-    # Validate parsed transactions
-    if not parsed_transactions or len(parsed_transactions) == 0:
+    except Exception as e:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="No valid transactions found in the CSV file. Please check the file format and ensure it contains Date, Description, and Amount columns."
+            detail=f"Error parsing CSV file: {str(e)}. Please check that your CSV file has the required columns: Date, Description, Amount"
         )
     
-    # Import transactions
-    created_count = 0
-    updated_count = 0
-    errors = []
+    created_count = len(new_ids)
     
-    for trans_data in parsed_transactions:
-        try:
-            # Check for duplicate (same date, amount, description for this account)
-            existing = db.query(Transaction).filter(
-                and_(
-                    Transaction.account_id == actual_account_id,
-                    Transaction.date == trans_data["date"],
-                    Transaction.amount == trans_data["amount"],
-                    Transaction.description == trans_data["description"]
-                )
-            ).first()
-            
-            if existing:
-                # Update existing transaction
-                for key, value in trans_data.items():
-                    setattr(existing, key, value)
-                updated_count += 1
-            else:
-                # Create new transaction
-                new_transaction = Transaction(
-                    user_id=current_user.id,
-                    **trans_data
-                )
-                db.add(new_transaction)
-                created_count += 1
-                
-        except Exception as e:
-            errors.append(f"Error importing transaction: {str(e)}")
+    # Auto-categorize if requested (RETURNING already gave us the new IDs),
+    # after the response is sent
+    task_id = None
+    if auto_categorize and new_ids:
+        task_id = create_task(current_user.id)
+        background_tasks.add_task(run_categorization_task, task_id, current_user.id, new_ids, True)
     
-    db.commit()
-    
-    # Auto-categorize if requested
-    if auto_categorize and created_count > 0:
-        # Get IDs of newly created transactions
-        new_transactions = db.query(Transaction).filter(
-            and_(
-                Transaction.user_id == current_user.id,
-                Transaction.account_id == actual_account_id,
-                Transaction.is_categorized == False
-            )
-        ).order_by(Transaction.id.desc()).limit(created_count).all()
-        
-        transaction_ids = [t.id for t in new_transactions]
-        categorize_batch(transaction_ids, db, use_ai=True)
+    # Imported rows change this user's monthly totals
+    invalidate_user_insights(current_user.id)
     
     return TransactionUploadResponse(
         transactions_created=created_count,
         transactions_updated=updated_count,
-        errors=errors
+        errors=errors,
+        categorization_task_id=task_id
     )
 
 
-@router.get("", response_model=List[TransactionResponse])
+class _UTCJSONResponse(ORJSONResponse):
+    """ORJSONResponse that writes UTC datetimes with a "Z" suffix, exactly as pydantic does."""
+    
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+
+# Nested objects list_transactions can embed in each transaction
+LIST_INCLUDES = {"account", "category"}
+
+_TRANSACTION_COLUMNS = (
+    Transaction.id, Transaction.user_id, Transaction.account_id, Transaction.category_id,
+    Transaction.date, Transaction.description, Transaction.amount_cents,
+    Transaction.transaction_type, Transaction.is_categorized,
+    Transaction.created_at, Transaction.updated_at
+)
+_ACCOUNT_COLUMNS = (
+    Account.id.label("account__id"), Account.user_id.label("account__user_id"),
+    Account.name.label("account__name"), Account.account_type.label("account__account_type"),
+    Account.balance_cents.label("account__balance_cents"), Account.created_at.label("account__created_at")
+)
+_CATEGORY_COLUMNS = (
+    Category.id.label("category__id"), Category.name.label("category__name"),
+    Category.color.label("category__color"), Category.icon.label("category__icon")
+)
+
+
+def _money(cents: Optional[int]) -> Optional[str]:
+    """Cents as the decimal string pydantic writes for Decimal fields (-550 -> "-5.50")."""
+    amount = from_cents(cents)
+    return None if amount is None else str(amount)
+
+
+def _transaction_json(row, include: set) -> dict:
+    """
+    Build one list_transactions item (TransactionResponse's JSON shape)
+    straight from a result row, without a model instance in between.
+    """
+    item = {
+        "id": row.id,
+        "user_id": row.user_id,
+        "account_id": row.account_id,
+        "category_id": row.category_id,
+        "date": row.date,
+        "description": row.description,
+        "amount": _money(row.amount_cents),
+        "transaction_type": row.transaction_type,
+        "is_categorized": row.is_categorized,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at,
+        "account": None,
+        "category": None
+    }
+    if "account" in include:
+        item["account"] = {
+            "id": row.account__id,
+            "user_id": row.account__user_id,
+            "name": row.account__name,
+            "account_type": row.account__account_type,
+            "balance": _money(row.account__balance_cents),
+            "created_at": row.account__created_at
+        }
+    if "category" in include and row.category__id is not None:
+        item["category"] = {
+            "id": row.category__id,
+            "name": row.category__name,
+            "color": row.category__color,
+            "icon": row.category__icon
+        }
+    return item
+
+
+@router.get("", response_class=_UTCJSONResponse, responses={200: {"model": List[TransactionResponse]}})
 def list_transactions(
     account_id: Optional[int] = Query(None),
     category_id: Optional[int] = Query(None),
@@ -217,7 +387,11 @@ def list_transactions(
     end_date: Optional[datetime] = Query(None),
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
-    current_user: User = Depends(get_current_user),
+    include: str = Query(
+        "",
+        description="Nested objects to embed, comma-separated (account, category); none by default"
+    ),
+    current_user: UserClaims = Depends(current_user_dep),
     db: Session = Depends(get_db)
 ):
     """
@@ -230,9 +404,17 @@ def list_transactions(
     - end_date: End of date range
     - limit: Number of results (default 100, max 1000)
     - offset: Pagination offset
+    - include: Nested objects to embed, e.g. "account,category" (by default
+      none: account and category are null, account_id/category_id are set,
+      and the SELECT has no joins)
+    
+    The page is fetched as plain rows in one SELECT (account and category
+    joined in) and written with orjson, instead of building ORM objects and
+    then TransactionResponse models just to serialize them. The JSON is the
+    same as TransactionResponse's.
     
     Example request:
-        GET /api/transactions?account_id=1&start_date=2024-01-01&limit=50
+        GET /api/transactions?account_id=1&start_date=2024-01-01&limit=50&include=category
     
     Example response:
         [
@@ -247,35 +429,54 @@ def list_transactions(
             ...
         ]
     """
+    includes = {name.strip() for name in include.split(",") if name.strip()}
+    unknown = includes - LIST_INCLUDES
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown include: {', '.join(sorted(unknown))} (allowed: account, category)"
+        )
+    
+    # Only the columns the response needs; joins only for embedded objects
+    columns = list(_TRANSACTION_COLUMNS)
+    if "account" in includes:
+        columns += _ACCOUNT_COLUMNS
+    if "category" in includes:
+        columns += _CATEGORY_COLUMNS
+    
     # Start with base query: only current user's transactions
-    query = db.query(Transaction).filter(Transaction.user_id == current_user.id)
+    query = select(*columns).where(Transaction.user_id == current_user.id)
+    if "account" in includes:
+        query = query.join(Account, Transaction.account_id == Account.id)
+    if "category" in includes:
+        query = query.outerjoin(Category, Transaction.category_id == Category.id)
     
     # Apply filters
     if account_id:
-        query = query.filter(Transaction.account_id == account_id)
+        query = query.where(Transaction.account_id == account_id)
     
     if category_id:
-        query = query.filter(Transaction.category_id == category_id)
+        query = query.where(Transaction.category_id == category_id)
     
     if start_date:
-        query = query.filter(Transaction.date >= start_date)
+        query = query.where(Transaction.date >= start_date)
     
     if end_date:
-        query = query.filter(Transaction.date <= end_date)
+        query = query.where(Transaction.date <= end_date)
     
     # Order by date (newest first)
     query = query.order_by(Transaction.date.desc())
     
     # Apply pagination
-    transactions = query.offset(offset).limit(limit).all()
+    rows = db.execute(query.offset(offset).limit(limit))
     
-    return transactions
+    return _UTCJSONResponse([_transaction_json(row, includes) for row in rows])
 
 
 @router.post("", response_model=TransactionResponse, status_code=status.HTTP_201_CREATED)
 def create_transaction(
     transaction_data: TransactionCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserClaims = Depends(current_user_dep),
     db: Session = Depends(get_db)
 ):
     """
@@ -315,9 +516,11 @@ def create_transaction(
     if transaction_data.category_id:
         new_transaction.is_categorized = True
     
+    # No dedup_hash: manual entries are never treated as duplicates
     db.add(new_transaction)
     db.commit()
     db.refresh(new_transaction)
+    invalidate_user_insights(current_user.id)
     
     return new_transaction
 
@@ -326,7 +529,7 @@ def create_transaction(
 def categorize_transactions(
     transaction_ids: Optional[List[int]] = None,
     use_ai: bool = Query(True, description="Use AI for uncategorized transactions"),
-    current_user: User = Depends(get_current_user),
+    current_user: UserClaims = Depends(current_user_dep),
     db: Session = Depends(get_db)
 ):
     """
@@ -349,41 +552,90 @@ def categorize_transactions(
         }
     """
     if transaction_ids:
-        # Verify all transactions belong to user
-        transactions = db.query(Transaction).filter(
+        # Verify all transactions belong to user (a count, not the rows)
+        owned = db.query(func.count(Transaction.id)).filter(
             and_(
                 Transaction.id.in_(transaction_ids),
                 Transaction.user_id == current_user.id
             )
-        ).all()
+        ).scalar()
         
-        if len(transactions) != len(transaction_ids):
+        if owned != len(transaction_ids):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Some transactions not found"
             )
         
-        ids_to_categorize = transaction_ids
+        result = categorize_batch(transaction_ids, db, use_ai=use_ai)
     else:
-        # Get all uncategorized transactions for user
-        uncategorized = db.query(Transaction).filter(
-            and_(
-                Transaction.user_id == current_user.id,
-                Transaction.is_categorized == False
-            )
-        ).all()
-        ids_to_categorize = [t.id for t in uncategorized]
+        # All uncategorized transactions for user, CATEGORIZE_CHUNK_SIZE IDs at
+        # a time: only one chunk is ever in memory, however large the backlog
+        result = {"categorized": 0, "uncategorized": 0, "errors": []}
+        for ids in _uncategorized_id_chunks(db, current_user.id):
+            chunk_result = categorize_batch(ids, db, use_ai=use_ai)
+            result["categorized"] += chunk_result["categorized"]
+            result["uncategorized"] += chunk_result["uncategorized"]
+            result["errors"].extend(chunk_result["errors"])
     
-    # Categorize
-    result = categorize_batch(ids_to_categorize, db, use_ai=use_ai)
+    invalidate_user_insights(current_user.id)
     
     return result
 
 
+def _uncategorized_id_chunks(db: Session, user_id: int):
+    """
+    Yield the IDs of a user's uncategorized transactions in chunks.
+    
+    Keyset pagination (id > last seen, in id order, via the
+    idx_user_uncategorized partial index) rather than a server-side cursor:
+    categorize_batch commits after each chunk, and a commit would close the
+    cursor. Transactions that stay uncategorized are not visited twice,
+    since each page starts after the previous one's last ID.
+    """
+    last_id = 0
+    while True:
+        ids = db.scalars(
+            select(Transaction.id).where(
+                Transaction.user_id == user_id,
+                Transaction.is_categorized == False,
+                Transaction.id > last_id
+            ).order_by(Transaction.id).limit(CATEGORIZE_CHUNK_SIZE)
+        ).all()
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+@router.get("/categorize/status/{task_id}", response_model=CategorizationTaskStatus)
+def get_categorization_status(
+    task_id: str,
+    current_user: UserClaims = Depends(current_user_dep)
+):
+    """
+    Get the status of a background categorization task (queued by upload).
+    
+    Example response:
+        {
+            "task_id": "3f2b9c...",
+            "status": "completed",
+            "result": {"categorized": 40, "uncategorized": 5, "errors": []},
+            "error": null
+        }
+    """
+    task = get_task_status(task_id, current_user.id)
+    if task is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    return task
+
+
 @router.get("/{transaction_id}", response_model=TransactionResponse)
 def get_transaction(
     transaction_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserClaims = Depends(current_user_dep),
     db: Session = Depends(get_db)
 ):
     """Get a single transaction by ID."""
@@ -408,7 +660,7 @@ def update_transaction(
     transaction_id: int,
     category_id: Optional[int] = None,
     description: Optional[str] = None,
-    current_user: User = Depends(get_current_user),
+    current_user: UserClaims = Depends(current_user_dep),
     db: Session = Depends(get_db)
 ):
     """Update a transaction (typically to change category or description)."""
@@ -435,6 +687,7 @@ def update_transaction(
     
     db.commit()
     db.refresh(transaction)
+    invalidate_user_insights(current_user.id)
     
     return transaction
 
@@ -97,6 +97,20 @@ class TransactionCreate(BaseModel):
     category_id: Optional[int] = None
 
 
+class TransactionImportRow(BaseModel):
+    """
+    A row produced by the CSV parser, validated before bulk insert.
+    
+    Same checks as TransactionCreate, but the amount is already integer
+    cents (the parser converts it, so imports skip the Decimal round trip).
+    """
+    account_id: int
+    date: datetime
+    description: str = Field(..., min_length=1, max_length=500)
+    amount_cents: int
+    transaction_type: str = Field(..., description="debit, credit, or transfer")
+
+
 class TransactionResponse(BaseModel):
     """Response schema for transaction data."""
     id: int
@@ -138,6 +152,17 @@ class TransactionUploadResponse(BaseModel):
     transactions_created: int
     transactions_updated: int
     errors: List[str] = []
+    # Set when auto-categorization was queued; poll
+    # GET /api/transactions/categorize/status/{task_id} for the outcome
+    categorization_task_id: Optional[str] = None
+
+
+class CategorizationTaskStatus(BaseModel):
+    """Status of a background categorization task."""
+    task_id: str
+    status: str  # pending, completed, failed
+    result: Optional[dict] = None  # {categorized, uncategorized, errors} once completed
+    error: Optional[str] = None  # Error message if failed
 
 
 # ==================== Budget Schemas ====================
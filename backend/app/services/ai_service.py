@@ -13,46 +13,136 @@ We use LangChain for:
 - Potential future: caching, streaming, etc.
 """
 
-from typing import Optional, List
+import hashlib
+import json
+import logging
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
-from langchain.schema import HumanMessage
+
+# LangChain (and the OpenAI client and tokenizer code it pulls in) is
+# imported inside the functions that call the LLM, not here: this module is
+# imported at startup via categorization, and most requests never reach an
+# LLM call, so the cost is paid on first use instead of by every worker boot
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
 
 from app.config import settings
-from app.models import Category
+from app.models import Category, CategoryCache
+from app.services.cache import cache_get, cache_set
+
+logger = logging.getLogger(__name__)
 
 # Lazy initialization of OpenAI LLM
 # Only initialize if API key is available
-_llm: Optional[ChatOpenAI] = None
+_llm: Optional["ChatOpenAI"] = None
 
-def get_llm() -> Optional[ChatOpenAI]:
+def get_llm() -> Optional["ChatOpenAI"]:
     """Get or create the LLM instance. Returns None if API key is not configured."""
     global _llm
     if not settings.OPENAI_API_KEY:
         return None
     if _llm is None:
+        from langchain_openai import ChatOpenAI
+        
         _llm = ChatOpenAI(
     model_name="gpt-3.5-turbo",
     temperature=0.3,
-    openai_api_key=settings.OPENAI_API_KEY
+    openai_api_key=settings.OPENAI_API_KEY,
+    # Rate-limit (429) and transient errors are retried with exponential
+    # backoff by the OpenAI client; concurrent batches make them likelier
+    max_retries=settings.AI_MAX_RETRIES
 )
     return _llm
 
 
-def categorize_with_ai(description: str, db: Session) -> Optional[Category]:
+# Store numbers, dates and reference numbers vary between otherwise identical
+# descriptions ("STARBUCKS STORE #1234" vs "#5678"); dropping them lets every
+# visit to a merchant share one cached AI answer
+_VOLATILE_CHARS = re.compile(r"[\d#]+")
+
+
+@lru_cache(maxsize=4096)
+def description_cache_key(description: str, category_names: Tuple[str, ...]) -> str:
+    """
+    Cache key for an AI categorization (see models.CategoryCache).
+    
+    The normalized description (digits and '#' removed, lowercased,
+    whitespace collapsed) is hashed together with the category names, so
+    adding or renaming a category naturally starts a fresh set of answers.
+    
+    Args:
+        description: Transaction description
+        category_names: Sorted names of the candidate categories
+    
+    Returns:
+        32-character BLAKE2b hex digest
+    """
+    normalized = " ".join(_VOLATILE_CHARS.sub("", description).lower().split())
+    raw = "\0".join((normalized,) + category_names)
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+def _category_names(categories: List[Category]) -> Tuple[str, ...]:
+    return tuple(sorted(category.name for category in categories))
+
+
+def _cached_category_ids(db: Session, keys: Iterable[str]) -> Dict[str, int]:
+    """Look up remembered answers for many cache keys in one query."""
+    keys = list(keys)
+    if not keys:
+        return {}
+    return dict(
+        db.query(CategoryCache.hash_key, CategoryCache.category_id)
+        .filter(CategoryCache.hash_key.in_(keys))
+        .all()
+    )
+
+
+def _remember_category_ids(db: Session, answers: Dict[str, int]) -> None:
+    """
+    Store new AI answers (committed with the caller's categorization).
+    
+    ON CONFLICT DO NOTHING: a concurrent request may have cached the same
+    merchant first, and either answer is fine.
+    """
+    if not answers:
+        return
+    db.execute(
+        pg_insert(CategoryCache)
+        .values([{"hash_key": key, "category_id": category_id} for key, category_id in answers.items()])
+        .on_conflict_do_nothing(index_elements=["hash_key"])
+    )
+
+
+def categorize_with_ai(
+    description: str,
+    db: Session,
+    categories: Optional[List[Category]] = None
+) -> Optional[Category]:
     """
     Use AI to categorize a transaction based on its description.
     
     Process:
-    1. Get list of available categories from database
-    2. Build prompt with description and categories
-    3. Call LLM to determine best category
-    4. Map LLM response to Category object
+    1. Get list of available categories (from the caller, or the database)
+    2. Ask the LLM through the batch path (a batch of one): JSON-mode
+       prompt, answer matched to the loaded categories in Python
+    3. Return the matching Category object
+    
+    The answer is resolved against the categories already in memory, so
+    there is no follow-up ILIKE query to find the category by name.
+    Answers are remembered in the category_cache table by normalized
+    description, so repeat merchants skip the LLM call. New answers are
+    written to the session and committed along with the transaction.
     
     Args:
         description: Transaction description (e.g., "STARBUCKS STORE #1234")
         db: Database session
+        categories: Preloaded categories; pass them when categorizing several
+            descriptions so each call doesn't query the table again
     
     Returns:
         Category object if found, None otherwise
@@ -64,74 +154,200 @@ def categorize_with_ai(description: str, db: Session) -> Optional[Category]:
     if not settings.OPENAI_API_KEY:
         return None  # AI features disabled
     
-    # Get all categories
-    categories = db.query(Category).all()
+    # Get all categories, unless the caller already has them
+    if categories is None:
+        categories = db.query(Category).all()
     if not categories:
         return None
     
-    # Build category list for prompt
-    category_list = "\n".join([f"- {cat.name}" for cat in categories])
+    return categorize_with_ai_batch([description], categories, db)[0]
+
+
+# Descriptions per LLM call when categorizing in batch: large enough to cut
+# the round-trips ~50x, small enough that the answer stays well within the
+# model's output limit and one bad response only loses one batch
+AI_CATEGORIZE_BATCH_SIZE = 50
+
+
+@lru_cache(maxsize=None)
+def _batch_prompt():
+    """The batch categorization prompt template (built once, on first use)."""
+    from langchain.prompts import ChatPromptTemplate
     
-    # Create prompt template
-    prompt = ChatPromptTemplate.from_messages([
+    return ChatPromptTemplate.from_messages([
         ("system", """You are a financial categorization assistant. 
-        Analyze transaction descriptions and assign them to the most appropriate category.
-        Return ONLY the category name, nothing else."""),
-        ("human", """Transaction description: {description}
+    Analyze transaction descriptions and assign each one to the most appropriate category.
+    Respond with a JSON object of the form {{"categories": ["<category name>", ...]}}
+    containing exactly one category name per transaction, in the same order."""),
+        ("human", """Transactions:
+{descriptions}
 
 Available categories:
 {categories}
 
-Which category best fits this transaction? Return only the category name.""")
+Return the JSON object with one category name for each numbered transaction.""")
     ])
+
+
+def _match_category_name(name: str, categories: List[Category]) -> Optional[Category]:
+    """
+    Map a category name from the LLM to one of the given categories.
     
-    try:
-        llm = get_llm()
-        if not llm:
-            return None
-        
-        # Format prompt with variables
-        messages = prompt.format_messages(
-            description=description,
+    Exact (case-insensitive) match first, then a substring match (what
+    ILIKE '%name%' would find), all against categories already in memory.
+    """
+    name = name.strip().lower()
+    if not name:
+        return None
+    for category in categories:
+        if category.name.lower() == name:
+            return category
+    for category in categories:
+        if name in category.name.lower():
+            return category
+    return None
+
+
+def categorize_with_ai_batch(
+    descriptions: List[str],
+    categories: List[Category],
+    db: Session
+) -> List[Optional[Category]]:
+    """
+    Use AI to categorize many transaction descriptions with few LLM calls.
+    
+    Descriptions are sent AI_CATEGORIZE_BATCH_SIZE at a time as a numbered
+    list, and the model answers with a JSON array of category names in the
+    same order (JSON mode, so the reply always parses). Batches are sent
+    concurrently, up to AI_CATEGORIZE_CONCURRENCY calls in flight. Descriptions that
+    differ only in store/reference numbers are sent once, and merchants already in the category_cache table
+    (looked up in one query) aren't sent at all. New answers are added to
+    the session for the caller to commit.
+    
+    Args:
+        descriptions: Transaction descriptions to categorize
+        categories: Candidate categories (loaded once by the caller)
+        db: Database session (for the category cache)
+    
+    Returns:
+        One Category (or None if the AI couldn't place it) per description,
+        in the same order as descriptions
+    
+    Example:
+        Input: ["AMAZON.COM PURCHASE", "UBER TRIP"]
+        Output: [Category(name="Shopping"), Category(name="Transport")]
+    """
+    results: List[Optional[Category]] = [None] * len(descriptions)
+    if not settings.OPENAI_API_KEY or not descriptions or not categories:
+        return results  # AI features disabled or nothing to do
+    
+    # Descriptions that normalize to the same key ("AMAZON #12", "AMAZON #34")
+    # are one question: ask about the first, copy the answer to every position
+    category_names = _category_names(categories)
+    positions = defaultdict(list)   # cache key -> indexes into descriptions
+    representative = {}             # cache key -> description sent to the LLM
+    for index, description in enumerate(descriptions):
+        cache_key = description_cache_key(description, category_names)
+        positions[cache_key].append(index)
+        representative.setdefault(cache_key, description)
+    
+    # Answer what we can from the cache; only the rest go to the LLM
+    categories_by_id = {category.id: category for category in categories}
+    cached_ids = _cached_category_ids(db, positions)
+    
+    pending = []
+    for cache_key, indexes in positions.items():
+        category = categories_by_id.get(cached_ids.get(cache_key))
+        if category:
+            for index in indexes:
+                results[index] = category
+        else:
+            pending.append(cache_key)
+    
+    if not pending:
+        return results
+    
+    llm = get_llm()
+    if not llm:
+        return results
+    
+    learned = {}
+    category_list = "\n".join([f"- {cat.name}" for cat in categories])
+    
+    batches = [
+        pending[start:start + AI_CATEGORIZE_BATCH_SIZE]
+        for start in range(0, len(pending), AI_CATEGORIZE_BATCH_SIZE)
+    ]
+    prompts = [
+        _batch_prompt().format_messages(
+            descriptions="\n".join(
+                f"{number}) {representative[cache_key]}" for number, cache_key in enumerate(batch, start=1)
+            ),
             categories=category_list
         )
+        for batch in batches
+    ]
+    
+    # The calls are independent and I/O-bound: run up to
+    # AI_CATEGORIZE_CONCURRENCY of them at once instead of one after another.
+    # return_exceptions keeps one failed call from discarding the others
+    responses = llm.batch(
+        prompts,
+        config={"max_concurrency": settings.AI_CATEGORIZE_CONCURRENCY},
+        return_exceptions=True,
+        response_format={"type": "json_object"}
+    )
+    
+    for batch, response in zip(batches, responses):
+        try:
+            if isinstance(response, Exception):
+                raise response
+            answers = json.loads(response.content).get("categories", [])
+        except Exception:
+            # One failed batch leaves its transactions uncategorized; keep going
+            logger.exception("AI batch categorization failed (%d descriptions)", len(batch))
+            continue
         
-        # Call LLM
-        response = llm(messages)
-        category_name = response.content.strip()
-        
-        # Find matching category (case-insensitive)
-        category = db.query(Category).filter(
-            Category.name.ilike(f"%{category_name}%")
-        ).first()
-        
-        return category
-        
-    except Exception as e:
-        print(f"AI categorization error: {e}")
-        return None
+        # zip() stops at the shorter list if the model returned too few names
+        for cache_key, name in zip(batch, answers):
+            category = _match_category_name(str(name), categories)
+            if category:
+                learned[cache_key] = category.id
+            for index in positions[cache_key]:
+                results[index] = category
+    
+    _remember_category_ids(db, learned)
+    return results
 
 
 def generate_monthly_summary(
     month: int,
     year: int,
     user_id: int,
-    db: Session
+    db: Session,
+    totals: Optional[Tuple[int, int, int]] = None,
+    category_totals: Optional[List[Tuple[str, int]]] = None
 ) -> str:
     """
     Generate AI-powered monthly financial summary.
     
     Process:
-    1. Query transactions for the month
-    2. Calculate statistics (total income, expenses, top categories, etc.)
-    3. Build prompt with financial data
-    4. Generate natural language summary
+    1. Aggregate the month in SQL (totals + top categories), unless the
+       caller already has the numbers
+    2. Build prompt with financial data
+    3. Generate natural language summary
+    
+    The insights endpoint computes exactly these aggregates for its own
+    response and passes them in, so a summary costs no extra queries there.
     
     Args:
         month: Month (1-12)
         year: Year
         user_id: User ID
         db: Database session
+        totals: Optional precomputed (transaction count, income cents, expense cents)
+        category_totals: Optional precomputed [(category name, expense cents)],
+                         largest first
     
     Returns:
         Natural language summary string
@@ -139,35 +355,49 @@ def generate_monthly_summary(
     if not settings.OPENAI_API_KEY:
         return "AI insights are not available. Please configure OPENAI_API_KEY."
     
-    from app.models import Transaction
-    from sqlalchemy import and_, func
-    from decimal import Decimal
+    from app.models import Transaction, month_bounds
+    from sqlalchemy import and_, case, cast, desc, func, BigInteger
     
-    # Query transactions for the month
-    transactions = db.query(Transaction).filter(
-        and_(
-            Transaction.user_id == user_id,
-            func.extract('month', Transaction.date) == month,
-            func.extract('year', Transaction.date) == year
-        )
-    ).all()
+    # Month filter: half-open range so the (user_id, date) index is used;
+    # extract() on the column would force a scan
+    start, end = month_bounds(year, month)
+    in_month = and_(
+        Transaction.user_id == user_id,
+        Transaction.date >= start,
+        Transaction.date < end
+    )
     
-    if not transactions:
+    # Totals in one aggregate row (SUM over BIGINT is NUMERIC in PostgreSQL,
+    # hence the casts back to integer cents)
+    if totals is None:
+        totals = db.query(
+            func.count(Transaction.id),
+            cast(func.coalesce(func.sum(case((Transaction.amount_cents > 0, Transaction.amount_cents))), 0), BigInteger),
+            cast(func.coalesce(func.sum(case((Transaction.amount_cents < 0, -Transaction.amount_cents))), 0), BigInteger)
+        ).filter(in_month).one()
+    transaction_count, income_cents, expense_cents = totals
+    
+    if not transaction_count:
         return f"No transactions found for {month}/{year}."
     
-    # Calculate statistics
-    total_income = sum(t.amount for t in transactions if t.amount > 0)
-    total_expenses = abs(sum(t.amount for t in transactions if t.amount < 0))
-    net_income = total_income - total_expenses
+    # Calculate statistics (integer cents; converted to dollars only for the prompt)
+    total_income = income_cents / 100
+    total_expenses = expense_cents / 100
+    net_income = (income_cents - expense_cents) / 100
     
-    # Get category breakdown
-    category_totals = {}
-    for t in transactions:
-        if t.category and t.amount < 0:  # Only expenses
-            cat_name = t.category.name
-            category_totals[cat_name] = category_totals.get(cat_name, Decimal("0")) + abs(t.amount)
+    # Top expense categories, summed and ranked in SQL
+    if category_totals is None:
+        category_totals = db.query(
+            Category.name,
+            cast(func.sum(-Transaction.amount_cents), BigInteger).label("total_cents")
+        ).join(
+            Category, Transaction.category_id == Category.id
+        ).filter(
+            in_month,
+            Transaction.amount_cents < 0  # Only expenses
+        ).group_by(Category.name).order_by(desc("total_cents"), Category.name).limit(5).all()
     
-    top_categories = sorted(category_totals.items(), key=lambda x: x[1], reverse=True)[:5]
+    top_categories = [(cat, cents / 100) for cat, cents in category_totals[:5]]
     
     # Build prompt
     prompt = f"""Generate a concise monthly financial summary for {month}/{year}.
@@ -180,13 +410,27 @@ Financial Data:
 {chr(10).join([f"  - {cat}: ${amt:,.2f}" for cat, amt in top_categories])}
 
 Write a 2-3 sentence summary highlighting key insights and spending patterns."""
+
+    # Content-addressed cache: the prompt is built only from the aggregates,
+    # so identical numbers (even for a different user) reuse the summary and
+    # skip the OpenAI call; any change to the data or template is a new key
+    cache_key = f"ai_summary:{hashlib.blake2b(prompt.encode(), digest_size=16).hexdigest()}"
+    cached = cache_get(cache_key)
+    if cached is not None:
+        return cached
     
     try:
         llm = get_llm()
         if not llm:
             return "AI insights are not available. Please configure OPENAI_API_KEY."
+        from langchain.schema import HumanMessage
+        
         response = llm([HumanMessage(content=prompt)])
-        return response.content.strip()
+        summary = response.content.strip()
     except Exception as e:
+        # Errors are not cached, so the next request retries the API
         return f"Error generating summary: {str(e)}"
+    
+    cache_set(cache_key, summary, settings.AI_SUMMARY_CACHE_TTL)
+    return summary
 
@@ -0,0 +1,147 @@
+"""
+Cache service: short-lived storage for expensive, recomputable results.
+
+Used for:
+- Monthly insights responses (keyed by user, year and month)
+
+Backends:
+- Redis, when REDIS_URL is configured and the redis package is installed.
+  Shared by every worker process, so an invalidation on one worker is seen
+  by all of them.
+- An in-process TTL cache otherwise (single worker / local development).
+
+Values are stored as JSON, so only cache plain dicts/lists/strings/numbers.
+Cache failures never break a request: a Redis error is treated as a miss.
+"""
+
+import json
+import logging
+import threading
+from typing import Any, Optional
+
+from cachetools import TLRUCache
+
+from app.config import settings
+
+# Redis is optional - only needed to share the cache across workers
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class _MemoryBackend:
+    """In-process cache with per-entry TTLs (cachetools + a lock for thread safety)."""
+    
+    def __init__(self, maxsize: int = 10_000):
+        # TLRUCache expires each entry at the time returned by ttu;
+        # values are stored as (value, ttl) so every key keeps its own TTL
+        self._data: TLRUCache = TLRUCache(maxsize=maxsize, ttu=lambda key, entry, now: now + entry[1])
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(key)
+        return entry[0] if entry is not None else None
+    
+    def set(self, key: str, value: str, ttl: int) -> None:
+        with self._lock:
+            self._data[key] = (value, ttl)
+    
+    def delete_prefix(self, prefix: str) -> None:
+        with self._lock:
+            for key in [k for k in self._data.keys() if k.startswith(prefix)]:
+                self._data.pop(key, None)
+
+
+class _RedisBackend:
+    """Redis-backed cache (SETEX for TTLs, SCAN + DEL for prefix invalidation)."""
+    
+    def __init__(self, url: str):
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5)
+    
+    def get(self, key: str) -> Optional[str]:
+        value = self._client.get(key)
+        return value.decode() if value is not None else None
+    
+    def set(self, key: str, value: str, ttl: int) -> None:
+        self._client.setex(key, ttl, value)
+    
+    def delete_prefix(self, prefix: str) -> None:
+        keys = list(self._client.scan_iter(match=f"{prefix}*", count=500))
+        if keys:
+            self._client.delete(*keys)
+
+
+def _create_backend():
+    if settings.REDIS_URL and REDIS_AVAILABLE:
+        return _RedisBackend(settings.REDIS_URL)
+    return _MemoryBackend()
+
+
+_backend = _create_backend()
+
+
+def cache_get(key: str) -> Optional[Any]:
+    """
+    Look up a cached value.
+    
+    Args:
+        key: Cache key (e.g. "insights:1:2024:9")
+    
+    Returns:
+        The cached value, or None on a miss (or if the cache is unreachable)
+    """
+    try:
+        raw = _backend.get(key)
+    except Exception as e:
+        # No traceback: with Redis down this fires on every request
+        logger.warning("Cache get failed: %s", e)
+        return None
+    return json.loads(raw) if raw is not None else None
+
+
+def cache_set(key: str, value: Any, ttl: int) -> None:
+    """
+    Store a JSON-serializable value for ttl seconds.
+    
+    Args:
+        key: Cache key
+        value: Value to store (dicts, lists, strings, numbers)
+        ttl: Time to live in seconds
+    """
+    try:
+        _backend.set(key, json.dumps(value), ttl)
+    except Exception as e:
+        logger.warning("Cache set failed: %s", e)
+
+
+def cache_delete_prefix(prefix: str) -> None:
+    """
+    Drop every cached key starting with prefix (e.g. "insights:1:").
+    
+    Args:
+        prefix: Key prefix to invalidate
+    """
+    try:
+        _backend.delete_prefix(prefix)
+    except Exception as e:
+        logger.warning("Cache invalidation failed: %s", e)
+
+
+def insights_cache_key(user_id: int, year: int, month: int) -> str:
+    """Cache key for one user's monthly insights."""
+    return f"insights:{user_id}:{year}:{month}"
+
+
+def invalidate_user_insights(user_id: int) -> None:
+    """
+    Drop all cached monthly insights for a user.
+    
+    Call after any write that can change a user's totals (transaction
+    import/create/update/categorization, budget changes).
+    """
+    cache_delete_prefix(f"insights:{user_id}:")
@@ -13,66 +13,107 @@ Rule matching:
 AI categorization:
 - Uses OpenAI GPT to analyze transaction description
 - Returns category name, which we map to Category ID
-- Results can be cached to reduce API calls
+- Batches send many descriptions per call (categorize_with_ai_batch)
+- Answers are cached per normalized description (category_cache table),
+  so repeat merchants don't call the API again
 """
 
-from typing import Optional, List
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Optional, List
 from sqlalchemy.orm import Session
 from app.models import Transaction, Rule, Category
-from app.services.ai_service import categorize_with_ai
+from app.services.ai_service import categorize_with_ai, categorize_with_ai_batch
+
+# pyahocorasick is optional - it turns batch rule matching into one pass per
+# description; without it RuleMatcher checks the (pre-lowered) patterns in turn
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
 
 
 def categorize_transaction(
     transaction: Transaction,
     db: Session,
-    use_ai: bool = True
+    use_ai: bool = True,
+    rules: Optional["RuleMatcher"] = None,
+    categories_by_id: Optional[Dict[int, Category]] = None
 ) -> Optional[Category]:
     """
     Categorize a transaction using rules first, then AI if needed.
     
     Process:
-    1. Get all active rules for the user, ordered by priority
-    2. Try each rule pattern against transaction description
-    3. If no rule matches and use_ai=True, call AI service
-    4. Update transaction with category
+    1. Match the description against the user's active rules (priority order)
+    2. If no rule matches and use_ai=True, call AI service
+    3. Update transaction with category
+    
+    The change is only flushed, not committed: the caller commits once
+    after categorizing everything it needs to (and rolls back on error),
+    rather than paying for a commit per transaction.
+    
+    When categorizing several transactions, load the rules and categories
+    once (load_categories / load_rule_matcher) and pass them in; otherwise
+    each call queries them again.
     
     Args:
         transaction: Transaction object to categorize
-        db: Database session
+        db: Database session (the caller commits)
         use_ai: Whether to use AI if no rules match
+        rules: Preloaded RuleMatcher for the transaction's user
+        categories_by_id: Preloaded {id: Category}
     
     Returns:
         Category object if found, None otherwise
     """
-    # Step 1: Try rule-based categorization
-    rules = db.query(Rule).filter(
-        Rule.user_id == transaction.user_id,
-        Rule.is_active == True
-    ).order_by(Rule.priority.desc()).all()
+    if categories_by_id is None:
+        categories_by_id = load_categories(db)
+    if rules is None:
+        rules = load_rule_matcher(db, transaction.user_id, categories_by_id)
     
-    for rule in rules:
-        if matches_pattern(transaction.description, rule.pattern, rule.pattern_type):
-            # Found matching rule!
-            category = db.query(Category).filter(Category.id == rule.category_id).first()
-            if category:
-                transaction.category_id = category.id
-                transaction.is_categorized = True
-                db.commit()
-                return category
+    # Step 1: Try rule-based categorization (no query: the rule's category is
+    # looked up in the preloaded dict)
+    rule = rules.match(transaction.description)
+    if rule:
+        category = categories_by_id[rule.category_id]
+        transaction.category_id = category.id
+        transaction.is_categorized = True
+        db.flush()
+        return category
     
     # Step 2: If no rule matched, try AI categorization
     if use_ai:
-        category = categorize_with_ai(transaction.description, db)
+        category = categorize_with_ai(transaction.description, db, list(categories_by_id.values()))
         if category:
             transaction.category_id = category.id
             transaction.is_categorized = True
-            db.commit()
+            db.flush()
             return category
     
     # No category found
     return None
 
 
+@lru_cache(maxsize=1024)
+def compile_rule_regex(pattern: str) -> Optional[re.Pattern]:
+    """
+    Compile a regex rule pattern once (case-insensitive) and reuse it.
+    
+    Rules are matched against every transaction of every batch, so the
+    compiled pattern is kept here rather than relying on re's small shared
+    internal cache, which other code also churns through.
+    
+    Returns:
+        The compiled pattern, or None if the pattern is invalid
+    """
+    try:
+        return re.compile(pattern, re.IGNORECASE)
+    except re.error:
+        return None
+
+
 def matches_pattern(text: str, pattern: str, pattern_type: str) -> bool:
     """
     Check if text matches a pattern based on pattern type.
@@ -95,21 +136,141 @@ def matches_pattern(text: str, pattern: str, pattern_type: str) -> bool:
     elif pattern_type == "exact":
         return text_lower == pattern_lower
     elif pattern_type == "regex":
-        import re
-        try:
-            return bool(re.search(pattern, text, re.IGNORECASE))
-        except re.error:
-            return False
+        regex = compile_rule_regex(pattern)
+        return bool(regex and regex.search(text))
     else:
         return False
 
 
+class RuleMatcher:
+    """
+    A user's rules compiled once, for matching many descriptions.
+    
+    Same result as trying matches_pattern() rule by rule (first rule in
+    priority order wins), but:
+    - contains/starts_with/exact patterns go into one Aho-Corasick automaton,
+      so each description is scanned once no matter how many rules there
+      are; a hit at position 0 satisfies starts_with, a hit spanning the
+      whole description satisfies exact
+    - regex patterns are compiled up front, and shared across matchers and
+      batches via compile_rule_regex() (invalid ones never match)
+    - patterns are lowercased once, not once per transaction
+    """
+    
+    def __init__(self, rules: List[Rule]):
+        """
+        Args:
+            rules: Active rules in evaluation order (priority, highest first)
+        """
+        self._rules = rules
+        self._literals = []   # (order, lowercased pattern, pattern_type)
+        self._regexes = []    # (order, compiled pattern)
+        self._always = None   # first empty contains/starts_with rule (matches anything)
+        self._empty = None    # first empty exact rule (matches only "")
+        
+        for order, rule in enumerate(rules):
+            if rule.pattern_type == "regex":
+                regex = compile_rule_regex(rule.pattern)
+                if regex is not None:
+                    self._regexes.append((order, regex))
+            elif rule.pattern_type in ("contains", "starts_with", "exact"):
+                pattern = rule.pattern.lower()
+                if pattern:
+                    self._literals.append((order, pattern, rule.pattern_type))
+                elif rule.pattern_type != "exact":
+                    self._always = order if self._always is None else self._always
+                elif self._empty is None:
+                    self._empty = order
+        
+        self._automaton = None
+        if AHOCORASICK_AVAILABLE and self._literals:
+            # Several rules can share a pattern; each word carries all of them
+            rules_by_pattern = defaultdict(list)
+            for order, pattern, pattern_type in self._literals:
+                rules_by_pattern[pattern].append((order, pattern_type))
+            
+            self._automaton = ahocorasick.Automaton()
+            for pattern, entries in rules_by_pattern.items():
+                self._automaton.add_word(pattern, (len(pattern), entries))
+            self._automaton.make_automaton()
+    
+    def match(self, description: str) -> Optional[Rule]:
+        """
+        Find the rule that categorizes a description.
+        
+        Returns:
+            The first matching rule in priority order, or None
+        """
+        text = description.lower()
+        best = self._always  # lowest order (= highest priority) seen so far
+        if not text and self._empty is not None:
+            best = self._empty if best is None else min(best, self._empty)
+        
+        if self._automaton is not None:
+            for end, (length, entries) in self._automaton.iter(text):
+                at_start = end + 1 == length
+                for order, pattern_type in entries:
+                    if best is not None and order >= best:
+                        continue
+                    if (pattern_type == "contains"
+                            or (pattern_type == "starts_with" and at_start)
+                            or (pattern_type == "exact" and at_start and length == len(text))):
+                        best = order
+        else:
+            for order, pattern, pattern_type in self._literals:
+                if best is not None and order >= best:
+                    break
+                if ((pattern_type == "contains" and pattern in text)
+                        or (pattern_type == "starts_with" and text.startswith(pattern))
+                        or (pattern_type == "exact" and text == pattern)):
+                    best = order
+                    break
+        
+        # Regex rules only matter if they outrank the best literal match
+        for order, regex in self._regexes:
+            if best is not None and order >= best:
+                break
+            if regex.search(description):
+                best = order
+                break
+        
+        return self._rules[best] if best is not None else None
+
+
+def load_categories(db: Session) -> Dict[int, Category]:
+    """Load every category once, keyed by ID."""
+    return {category.id: category for category in db.query(Category).all()}
+
+
+def load_rule_matcher(db: Session, user_id: int, categories_by_id: Dict[int, Category]) -> RuleMatcher:
+    """
+    Load a user's active rules (one query) and compile them into a RuleMatcher.
+    
+    Rules pointing at a category that no longer exists are dropped, since
+    they can never apply.
+    """
+    rules = db.query(Rule).filter(
+        Rule.user_id == user_id,
+        Rule.is_active == True
+    ).order_by(Rule.priority.desc()).all()
+    return RuleMatcher([rule for rule in rules if rule.category_id in categories_by_id])
+
+
 def categorize_batch(transaction_ids: List[int], db: Session, use_ai: bool = True) -> dict:
     """
     Categorize multiple transactions in batch.
     
     Useful for bulk categorization after CSV upload.
     
+    Process:
+    1. Load all the transactions in one query
+    2. Apply each user's rules in Python (compiled once per user into a
+       RuleMatcher, so each description is scanned once)
+    3. Send every transaction no rule matched to the AI in batched calls
+       (AI_CATEGORIZE_BATCH_SIZE descriptions per request, not one each)
+    4. Write all assignments with one bulk UPDATE and commit once (rolled
+       back as a whole if it fails)
+    
     Args:
         transaction_ids: List of transaction IDs to categorize
         db: Database session
@@ -123,28 +284,60 @@ def categorize_batch(transaction_ids: List[int], db: Session, use_ai: bool = Tru
             "errors": []
         }
     """
-    categorized_count = 0
-    uncategorized_count = 0
     errors = []
+    if not transaction_ids:
+        return {"categorized": 0, "uncategorized": 0, "errors": errors}
+    
+    # Only the columns categorization needs, for every transaction at once
+    transactions = db.query(
+        Transaction.id, Transaction.user_id, Transaction.description
+    ).filter(Transaction.id.in_(transaction_ids)).all()
+    
+    categories_by_id = load_categories(db)
+    categories = list(categories_by_id.values())
+    
+    # Rules are loaded and compiled once per user in the batch (usually just one)
+    matchers_by_user = {}
+    assignments = {}  # transaction id -> category id
+    leftovers = []    # transactions no rule matched
+    
+    for transaction in transactions:
+        matcher = matchers_by_user.get(transaction.user_id)
+        if matcher is None:
+            matcher = load_rule_matcher(db, transaction.user_id, categories_by_id)
+            matchers_by_user[transaction.user_id] = matcher
+        
+        rule = matcher.match(transaction.description)
+        if rule:
+            assignments[transaction.id] = rule.category_id
+        else:
+            leftovers.append(transaction)
     
-    for trans_id in transaction_ids:
+    # One LLM call per AI_CATEGORIZE_BATCH_SIZE leftovers instead of one each
+    if use_ai and leftovers:
         try:
-            transaction = db.query(Transaction).filter(Transaction.id == trans_id).first()
-            if not transaction:
-                continue
-            
-            category = categorize_transaction(transaction, db, use_ai)
-            if category:
-                categorized_count += 1
-            else:
-                uncategorized_count += 1
-                
+            ai_categories = categorize_with_ai_batch(
+                [transaction.description for transaction in leftovers], categories, db
+            )
+            for transaction, category in zip(leftovers, ai_categories):
+                if category:
+                    assignments[transaction.id] = category.id
         except Exception as e:
-            errors.append(f"Transaction {trans_id}: {str(e)}")
+            errors.append(f"AI categorization: {str(e)}")
+    
+    if assignments:
+        try:
+            db.bulk_update_mappings(Transaction, [
+                {"id": transaction_id, "category_id": category_id, "is_categorized": True}
+                for transaction_id, category_id in assignments.items()
+            ])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
     
     return {
-        "categorized": categorized_count,
-        "uncategorized": uncategorized_count,
+        "categorized": len(assignments),
+        "uncategorized": len(transactions) - len(assignments),
         "errors": errors
     }
-
@@ -16,15 +16,147 @@ Design:
 - Returns structured transaction data
 """
 
+import codecs
 import csv
 import io
-from typing import List, Dict, Optional
+import itertools
+import logging
+import re
+from functools import lru_cache
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
 from datetime import datetime
 from decimal import Decimal
+import numpy as np
 import pandas as pd
+from app.models import to_cents
 
+logger = logging.getLogger(__name__)
 
-def parse_csv_file(file_content: bytes, account_id: int) -> List[Dict]:
+# pyarrow is optional - its multi-threaded CSV reader is used for files up to
+# PYARROW_MAX_BYTES; without it (or for bigger files) pandas' C engine reads
+# the file in chunks
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+# Cells read as missing ("nan" downstream). Mirrors pandas' default
+# na_values (pandas._libs.parsers.STR_NA_VALUES, as of pandas 2.1), kept
+# here because that module is private; every reader (read_csv, pyarrow and
+# the csv module) is given this same set, so they agree on what's missing
+NA_VALUES = frozenset({
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None",
+    "n/a", "nan", "null",
+})
+
+# Rows parsed (and handed to the caller) at a time when streaming a file
+DEFAULT_CHUNK_SIZE = 10_000
+
+# Files up to this size are read with the csv module (see _read_small_csv())
+SMALL_CSV_MAX_BYTES = 64 * 1024
+
+# Files up to this size are read in one go with pyarrow (when installed): it
+# has no chunksize, so bigger files stay on the C engine's bounded chunks
+PYARROW_MAX_BYTES = 10 * 1024 * 1024
+
+# Tried in order; the first one that decodes the whole file wins. utf-8-sig
+# also reads plain UTF-8, and latin-1 accepts any byte sequence (cp1252 and
+# iso-8859-1 are kept as documentation of what latin-1 stands in for)
+ENCODINGS = ['utf-8-sig', 'latin-1', 'cp1252', 'iso-8859-1']
+
+# Bytes read at a time while checking the encoding
+_ENCODING_PROBE_BLOCK = 1024 * 1024
+
+# Map common column name variations to standard names (matched against the
+# lowercased, stripped header; balance is recognized but not imported)
+COLUMN_MAPPING = {
+    'date': ['date', 'transaction date', 'posted date', 'date posted'],
+    'description': ['description', 'memo', 'details', 'transaction', 'payee', 'merchant'],
+    'amount': ['amount', 'transaction amount', 'debit', 'credit'],
+    'balance': ['balance', 'running balance', 'available balance']
+}
+
+# Reverse of COLUMN_MAPPING: header name -> role
+_ALIAS_TO_ROLE = {
+    alias: role
+    for role, aliases in COLUMN_MAPPING.items()
+    for alias in aliases
+}
+
+# Amounts below this (in dollars) survive the float fast path in
+# _parse_amounts() exactly: their cents are well under 2**53
+_FLOAT_EXACT_LIMIT = 1e13
+
+# Most distinct date strings remembered per file by _parse_dates()
+_DATE_CACHE_SIZE = 10_000
+
+# Transaction type by "is the amount negative" (index 0/1); an object array,
+# so picking from it hands out these two str objects instead of new ones
+_TRANSACTION_TYPES = np.array(["credit", "debit"], dtype=object)
+
+# Date formats accepted in the date column, in order of preference (an
+# ambiguous value like 01/02/2024 takes the first format that fits)
+DATE_FORMATS = [
+    "%Y-%m-%d",
+    "%m/%d/%Y",
+    "%d/%m/%Y",
+    "%Y/%m/%d",
+    "%m-%d-%Y",
+    "%d-%m-%Y",
+    "%Y-%m-%d %H:%M:%S",
+    "%m/%d/%Y %H:%M:%S"
+]
+
+# Shape of every DATE_FORMATS entry: three digit groups with one separator,
+# optionally followed by whitespace and H:M:S. parse_date() uses it to pick
+# the formats a string can belong to without calling strptime (ASCII: like
+# strptime, it doesn't take other Unicode digits)
+_DATE_RE = re.compile(r"(\d+)([-/])(\d+)\2(\d+)(?:\s+(\d+):(\d+):(\d+))?", re.ASCII)
+
+
+def _date_layouts() -> Dict[Tuple[str, bool], List[Tuple[str, Tuple[str, str, str]]]]:
+    """
+    Index DATE_FORMATS by (separator, has time): e.g. ("/", False) ->
+    [("%m/%d/%Y", ("m", "d", "Y")), ("%d/%m/%Y", ("d", "m", "Y")), ...],
+    keeping DATE_FORMATS order within each entry.
+    """
+    layouts = {}
+    for fmt in DATE_FORMATS:
+        date_part, _, time_part = fmt.partition(" ")
+        separator = date_part[2]
+        fields = tuple(directive[1] for directive in date_part.split(separator))
+        if sorted(fields) != ["Y", "d", "m"] or time_part not in ("", "%H:%M:%S"):
+            continue  # Not this shape: parse_date()'s strptime fallback handles it
+        layouts.setdefault((separator, bool(time_part)), []).append((fmt, fields))
+    return layouts
+
+
+_DATE_LAYOUTS = _date_layouts()
+
+# First and last year of pandas' Timestamp range, each only partly inside
+# it; _parse_dates() leaves dates in them to parse_date()
+_TIMESTAMP_EDGE_YEARS = (pd.Timestamp.min.year, pd.Timestamp.max.year)
+
+# Digits strptime accepts for each directive: %Y exactly four, the others
+# one or two, within these ranges (%S allows leap seconds 60-61, which
+# datetime() then rejects, as in strptime)
+_FIELD_RANGES = {"m": (1, 12), "d": (1, 31), "H": (0, 23), "M": (0, 59), "S": (0, 61)}
+
+# A timestamp ending in second 60 or 61. pd.to_datetime's %S accepts those
+# too but, unlike datetime(), rolls them over into the next minute
+# ("10:11:60" -> 10:12:00), so _parse_dates() leaves them to parse_date()
+_LEAP_SECOND_RE = re.compile(r":6[01]$")
+
+
+def parse_csv_file(
+    file_content: Union[bytes, BinaryIO],
+    account_id: int,
+    max_rows: Optional[int] = None
+) -> List[Dict]:
     """
     Parse a bank CSV file and extract transactions.
     
@@ -34,12 +166,20 @@ def parse_csv_file(file_content: bytes, account_id: int) -> List[Dict]:
     3. Parses each row into a transaction dict
     4. Normalizes data (dates, amounts)
     
+    Convenience wrapper around iter_csv_file() that collects every chunk;
+    prefer iter_csv_file() for large uploads.
+    
     Args:
-        file_content: Raw bytes from uploaded CSV file
+        file_content: Raw bytes from uploaded CSV file, or a binary file object
         account_id: ID of the account these transactions belong to
+        max_rows: Stop after this many transactions (e.g. for a preview);
+                  the rest of the file isn't read
     
     Returns:
-        List of transaction dictionaries ready for database insertion
+        List of transaction dictionaries ready for database insertion: the
+        keys are Transaction column names, so a chunk of them goes into a
+        single Core INSERT (the upload route's _upsert_transactions() adds
+        user_id and dedup_hash and writes each chunk with one upsert)
     
     Example CSV format:
         Date,Description,Amount,Balance
@@ -52,68 +192,259 @@ def parse_csv_file(file_content: bytes, account_id: int) -> List[Dict]:
                 "account_id": 1,
                 "date": datetime(2024, 1, 15),
                 "description": "STARBUCKS STORE #1234",
-                "amount": Decimal("-5.50"),
+                "amount_cents": -550,
                 "transaction_type": "debit"
             },
             ...
         ]
     """
-    # Convert bytes to string (try multiple encodings)
-    content = None
-    encodings = ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252', 'iso-8859-1']
+    return [
+        transaction
+        for chunk in iter_csv_file(file_content, account_id, max_rows=max_rows)
+        for transaction in chunk
+    ]
+
+
+def iter_csv_file(
+    file: Union[bytes, BinaryIO],
+    account_id: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_rows: Optional[int] = None
+) -> Iterator[List[Dict]]:
+    """
+    Parse a bank CSV file as a stream of transaction chunks.
     
-    for encoding in encodings:
-        try:
-            content = file_content.decode(encoding)
-            break
-        except UnicodeDecodeError:
-            continue
+    Large files are never held in memory as a whole: pandas' C engine reads
+    (and decodes) them chunk_size rows at a time, and each chunk's
+    transactions are yielded before the next chunk is read. Peak memory is
+    O(chunk_size) instead of O(file size) (bytes + decoded text + DataFrame
+    + dicts). Files up to PYARROW_MAX_BYTES are read in one go with pyarrow
+    when it's installed, and then parsed chunk by chunk the same way; files
+    up to SMALL_CSV_MAX_BYTES skip pandas altogether (_read_small_csv()).
     
-    if content is None:
-        raise ValueError(
-            "Unable to decode file. Please ensure your CSV file is saved with UTF-8 encoding."
+    With max_rows, reading stops as soon as that many transactions have
+    been parsed, so e.g. a preview of a large export only reads the first
+    chunk of it.
+    
+    Args:
+        file: Binary file object (e.g. UploadFile.file; must be seekable),
+              or raw bytes
+        account_id: ID of the account these transactions belong to
+        chunk_size: Rows per yielded chunk
+        max_rows: Stop after this many transactions (None: the whole file)
+    
+    Yields:
+        Lists of transaction dictionaries (same shape as parse_csv_file())
+    
+    Raises:
+        ValueError: Undecodable file, missing columns, or no valid rows at
+            all (raised after the last chunk, so a caller writing chunks as
+            they come should do so in one transaction it can roll back)
+    """
+    if isinstance(file, (bytes, bytearray)):
+        file = io.BytesIO(file)
+    
+    encoding = _detect_encoding(file)
+    
+    # No point reading more rows per chunk than we're going to keep
+    if max_rows is not None:
+        chunk_size = max(1, min(chunk_size, max_rows))
+    
+    file_size = _file_size(file)
+    small = _read_small_csv(file, encoding) if file_size <= SMALL_CSV_MAX_BYTES else None
+    
+    if small is not None:
+        # Small file: plain rows from the csv module, sliced into chunks
+        columns, records = small
+        first = records[:chunk_size]
+        reader = (
+            records[start:start + chunk_size]
+            for start in range(chunk_size, len(records), chunk_size)
         )
+    else:
+        # Use pandas for robust CSV parsing (handles quotes, etc.)
+        try:
+            reader = None
+            if PYARROW_AVAILABLE and file_size <= PYARROW_MAX_BYTES:
+                reader = _read_with_pyarrow(file, encoding, chunk_size)
+            if reader is None:
+                # dtype=str: cells keep their text (no float round trip, e.g.
+                # '20240105' -> '20240105.0'), whichever engine read the file;
+                # only NA_VALUES count as missing, as in the other readers
+                reader = pd.read_csv(
+                    file, encoding=encoding, chunksize=chunk_size, dtype=str,
+                    keep_default_na=False, na_values=NA_VALUES
+                )
+            first = next(reader, None)
+        except pd.errors.EmptyDataError:
+            raise ValueError("CSV file is empty. Please upload a file with transaction data.")
+        except pd.errors.ParserError as e:
+            raise ValueError(f"Error parsing CSV file: {str(e)}. Please check that your file is a valid CSV.")
+        
+        # Check if DataFrame is empty
+        if first is None or first.empty:
+            raise ValueError("CSV file contains no data rows. Please ensure your file has transaction data.")
+        
+        # Normalize column names (lowercase, strip whitespace)
+        columns = first.columns.str.lower().str.strip()
+    
+    date_col, desc_col, amount_col = _find_columns(columns)
+    
+    row_errors = []
+    # Date strings already seen in this file -> parsed value (see _parse_dates)
+    date_cache = {}
+    row_num = 1  # Start at 1 (header is row 1, first data row is row 2)
+    parsed_count = 0
     
-    # Use pandas for robust CSV parsing (handles encoding, quotes, etc.)
     try:
-        df = pd.read_csv(io.StringIO(content))
-    except pd.errors.EmptyDataError:
-        raise ValueError("CSV file is empty. Please upload a file with transaction data.")
+        for chunk in itertools.chain([first], reader):
+            if small is not None:
+                transactions, row_num = _parse_records(
+                    chunk, columns, date_col, desc_col, amount_col, account_id, row_num, row_errors
+                )
+            else:
+                chunk.columns = columns
+                transactions, row_num = _parse_rows(
+                    chunk, date_col, desc_col, amount_col, account_id, row_num, row_errors,
+                    date_cache
+                )
+            if max_rows is not None and parsed_count + len(transactions) >= max_rows:
+                # Row limit reached: keep what fits and stop reading the file
+                transactions = transactions[:max_rows - parsed_count]
+                parsed_count += len(transactions)
+                if transactions:
+                    yield transactions
+                reader.close()
+                break
+            if transactions:
+                parsed_count += len(transactions)
+                yield transactions
     except pd.errors.ParserError as e:
         raise ValueError(f"Error parsing CSV file: {str(e)}. Please check that your file is a valid CSV.")
     
-    # Check if DataFrame is empty
-    if df.empty:
-        raise ValueError("CSV file contains no data rows. Please ensure your file has transaction data.")
-    
-    # Normalize column names (lowercase, strip whitespace)
-    df.columns = df.columns.str.lower().str.strip()
-    
-    # Map common column name variations to standard names
-    column_mapping = {
-        'date': ['date', 'transaction date', 'posted date', 'date posted'],
-        'description': ['description', 'memo', 'details', 'transaction', 'payee', 'merchant'],
-        'amount': ['amount', 'transaction amount', 'debit', 'credit'],
-        'balance': ['balance', 'running balance', 'available balance']
-    }
-    
-    # Find actual column names
-    date_col = None
-    desc_col = None
-    amount_col = None
-    
-    for col in df.columns:
-        col_lower = col.lower()
-        if col_lower in column_mapping['date']:
-            date_col = col
-        elif col_lower in column_mapping['description']:
-            desc_col = col
-        elif col_lower in column_mapping['amount']:
-            amount_col = col
+    # If no valid transactions were parsed, raise an error with details
+    if parsed_count == 0:
+        error_msg = "No valid transactions could be parsed from the CSV file."
+        if row_errors:
+            error_msg += f" Errors: {'; '.join(row_errors[:5])}"  # Show first 5 errors
+            if len(row_errors) > 5:
+                error_msg += f" (and {len(row_errors) - 5} more errors)"
+        raise ValueError(error_msg)
+    
+    # Log row errors if any (but don't fail if we have at least some valid
+    # transactions). The messages quote cell values from the user's file, so
+    # they're only logged at debug level
+    if row_errors:
+        logger.warning("%d CSV rows had parsing errors", len(row_errors))
+        logger.debug("First CSV row errors: %s", row_errors[:10])
+
+
+def _detect_encoding(file: BinaryIO) -> str:
+    """
+    Find the first encoding in ENCODINGS that decodes the whole file.
+    
+    Each candidate is checked with an incremental decoder over fixed-size
+    blocks (so only one block is in memory). The file is rewound so it can
+    be handed to pandas as-is: its C parser decodes the bytes itself, which
+    is cheaper than feeding it Python str from a TextIOWrapper.
+    
+    Raises:
+        ValueError: If no encoding can decode the file
+    """
+    for encoding in ENCODINGS:
+        file.seek(0)
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            while True:
+                block = file.read(_ENCODING_PROBE_BLOCK)
+                if not block:
+                    decoder.decode(b"", final=True)
+                    break
+                decoder.decode(block)
+        except UnicodeDecodeError:
+            continue
+        
+        file.seek(0)
+        return encoding
+    
+    raise ValueError(
+        "Unable to decode file. Please ensure your CSV file is saved with UTF-8 encoding."
+    )
+
+
+def _file_size(file: BinaryIO) -> int:
+    """Size of a seekable file in bytes (the position is left at the start)."""
+    size = file.seek(0, io.SEEK_END)
+    file.seek(0)
+    return size
+
+
+def _read_with_pyarrow(
+    file: BinaryIO,
+    encoding: str,
+    chunk_size: int
+) -> Optional[Iterator[pd.DataFrame]]:
+    """
+    Read the whole file with pyarrow and return it as chunk_size DataFrames.
+    
+    Every column is read as a string, with pandas' default null markers, so
+    the chunks hold exactly what the C engine (dtype=str) gives _parse_rows().
+    
+    Returns:
+        Iterator over the chunks, or None to leave the file to the C engine:
+        when pyarrow rejects it (ragged rows, no header, ...), so errors and
+        leniency stay the C engine's, or when it has duplicate column names
+        (which pandas renames and pyarrow doesn't)
+    """
+    read_options = pa_csv.ReadOptions(encoding=encoding)
+    try:
+        # The header comes from the first block; it names the string columns
+        names = pa_csv.open_csv(file, read_options=read_options).schema.names
+        if len(set(names)) != len(names):
+            file.seek(0)
+            return None
+        
+        file.seek(0)
+        table = pa_csv.read_csv(
+            file,
+            read_options=read_options,
+            convert_options=pa_csv.ConvertOptions(
+                column_types={name: pa.string() for name in names},
+                null_values=sorted(NA_VALUES),
+                strings_can_be_null=True
+            )
+        )
+    except pa.ArrowInvalid:
+        file.seek(0)
+        return None
+    
+    # Missing cells come back as None; NaN is what the rest of the parser expects
+    df = table.to_pandas().fillna(np.nan)
+    return (df.iloc[start:start + chunk_size] for start in range(0, len(df), chunk_size))
+
+
+def _find_columns(columns) -> Tuple[str, str, str]:
+    """
+    Find the date, description and amount columns among normalized names.
+    
+    Raises:
+        ValueError: If a required column is missing
+    """
+    # Find actual column names (one lookup per column; if several columns
+    # map to the same role, the last one wins)
+    resolved = {}
+    for col in columns:
+        role = _ALIAS_TO_ROLE.get(col)
+        if role:
+            resolved[role] = col
+    
+    date_col = resolved.get('date')
+    desc_col = resolved.get('description')
+    amount_col = resolved.get('amount')
     
     # Validate required columns exist
     if not date_col:
-        available_cols = ', '.join(list(df.columns))
+        available_cols = ', '.join(list(columns))
         raise ValueError(
             f"CSV file is missing a 'Date' column. "
             f"Please ensure your CSV has a column named 'Date' (or 'Transaction Date', 'Posted Date'). "
@@ -121,7 +452,7 @@ def parse_csv_file(file_content: bytes, account_id: int) -> List[Dict]:
         )
     
     if not desc_col:
-        available_cols = ', '.join(list(df.columns))
+        available_cols = ', '.join(list(columns))
         raise ValueError(
             f"CSV file is missing a 'Description' column. "
             f"Please ensure your CSV has a column named 'Description' (or 'Memo', 'Details', 'Transaction', 'Payee', 'Merchant'). "
@@ -129,64 +460,231 @@ def parse_csv_file(file_content: bytes, account_id: int) -> List[Dict]:
         )
     
     if not amount_col:
-        available_cols = ', '.join(list(df.columns))
+        available_cols = ', '.join(list(columns))
         raise ValueError(
             f"CSV file is missing an 'Amount' column. "
             f"Please ensure your CSV has a column named 'Amount' (or 'Transaction Amount', 'Debit', 'Credit'). "
             f"Found columns: {available_cols}"
         )
     
-    transactions = []
+    return date_col, desc_col, amount_col
+
+
+def _parse_rows(
+    df: pd.DataFrame,
+    date_col: str,
+    desc_col: str,
+    amount_col: str,
+    account_id: int,
+    row_num: int,
+    row_errors: List[str],
+    date_cache: Optional[Dict[str, Optional[datetime]]] = None
+) -> Tuple[List[Dict], int]:
+    """
+    Parse one chunk of rows into transaction dicts.
+    
+    The string cleanup and date parsing run as column operations over the
+    whole chunk (pandas' C paths); the per-row loop that remains only
+    checks the prepared values and builds the dicts.
+    
+    Args:
+        df: The chunk (columns already normalized)
+        date_col, desc_col, amount_col: Column names from _find_columns()
+        account_id: ID of the account these transactions belong to
+        row_num: File row number of the row before this chunk's first row
+        row_errors: Shared list that invalid rows are reported to
+        date_cache: Per-file cache for _parse_dates(), shared across chunks
+    
+    Returns:
+        (transactions, row number of this chunk's last row)
+    """
+    # Skip empty rows up front (one mask for the chunk), keeping each
+    # remaining row's file row number for error messages
+    last_row_num = row_num + len(df)
+    row_numbers = range(row_num + 1, last_row_num + 1)
+    empty_rows = df.isna().all(axis=1).to_numpy()
+    if empty_rows.any():
+        df = df[~empty_rows]
+        row_numbers = (row_num + 1 + np.flatnonzero(~empty_rows)).tolist()
+    
+    # Column-wise preparation: same text as str(value).strip() per cell
+    # (missing cells become 'nan')
+    date_strs = df[date_col].astype(str).str.strip()
+    descriptions = df[desc_col].astype(str).str.strip().to_numpy()
+    amount_strs = df[amount_col].astype(str).str.strip()
+    # Remove currency symbols and commas (plain str methods in one pass over
+    # the column: several times faster here than the .str accessor chain,
+    # and than str.translate(), which is slow at deleting characters)
+    clean_amounts = [
+        amount.replace('$', '').replace(',', '').strip()
+        for amount in amount_strs.to_numpy()
+    ]
+    cents, transaction_types = _parse_amounts(clean_amounts)
+    dates = _parse_dates(date_strs, date_cache)
+    
+    transactions = _build_transactions(
+        account_id, row_numbers, date_strs.to_numpy(), dates, descriptions,
+        amount_strs.to_numpy(), clean_amounts, cents, transaction_types, row_errors
+    )
+    return transactions, last_row_num
+
+
+def _read_small_csv(file: BinaryIO, encoding: str) -> Optional[Tuple[List[str], List[List[str]]]]:
+    """
+    Read a small file with the csv module instead of pandas.
+    
+    For a few hundred rows, pandas' per-call overhead (reader, DataFrame,
+    one Series per column operation) is most of the parse time. The csv
+    module tokenizes like read_csv's defaults (same quoting, blank and
+    whitespace-only lines skipped); anything where the two could differ
+    is left to pandas.
+    
+    Returns:
+        (normalized column names, data rows), or None to use pandas: no
+        data rows, malformed quoting, blank or duplicate column names, or a
+        row with more fields than the header
+    """
+    text = file.read().decode(encoding)
+    file.seek(0)
+    try:
+        rows = [
+            row for row in csv.reader(io.StringIO(text, newline=""), strict=True)
+            if len(row) > 1 or (row and row[0].strip(" \t"))
+        ]
+    except csv.Error:
+        return None
+    if len(rows) < 2:
+        return None
     
+    header = rows[0]
+    columns = [name.lower().strip() for name in header]
+    if not all(columns) or len(set(columns)) != len(columns):
+        return None
+    if any(len(row) > len(header) for row in rows[1:]):
+        return None
+    return columns, rows[1:]
+
+
+def _parse_records(
+    records: List[List[str]],
+    columns: List[str],
+    date_col: str,
+    desc_col: str,
+    amount_col: str,
+    account_id: int,
+    row_num: int,
+    row_errors: List[str]
+) -> Tuple[List[Dict], int]:
+    """
+    Parse csv module rows (see _read_small_csv()) into transaction dicts.
+    
+    The same checks and results as _parse_rows(), cell by cell: missing
+    cells (pandas' NA markers, or past the end of a short row) read as
+    'nan', and every date and amount goes through parse_date() / Decimal
+    in _build_transactions().
+    
+    Returns:
+        (transactions, row number of the last row)
+    """
+    date_idx = columns.index(date_col)
+    desc_idx = columns.index(desc_col)
+    amount_idx = columns.index(amount_col)
+    
+    def cell(record, idx):
+        value = record[idx] if idx < len(record) else ""
+        return "nan" if value in NA_VALUES else value.strip()
+    
+    row_numbers, date_strs, descriptions, amount_strs = [], [], [], []
+    for number, record in enumerate(records, start=row_num + 1):
+        # Skip empty rows
+        if all(value in NA_VALUES for value in record):
+            continue
+        row_numbers.append(number)
+        date_strs.append(cell(record, date_idx))
+        descriptions.append(cell(record, desc_idx))
+        amount_strs.append(cell(record, amount_idx))
+    
+    clean_amounts = [
+        amount.replace('$', '').replace(',', '').strip()
+        for amount in amount_strs
+    ]
+    unparsed = [None] * len(row_numbers)
+    transactions = _build_transactions(
+        account_id, row_numbers, date_strs, unparsed, descriptions,
+        amount_strs, clean_amounts, unparsed, unparsed, row_errors
+    )
+    return transactions, row_num + len(records)
+
+
+def _build_transactions(
+    account_id: int,
+    row_numbers,
+    date_strs,
+    dates,
+    descriptions,
+    amount_strs,
+    clean_amounts,
+    cents,
+    transaction_types,
+    row_errors: List[str]
+) -> List[Dict]:
+    """
+    Check prepared row values and build the transaction dicts.
+    
+    All arguments after account_id are parallel sequences, one item per
+    (non-empty) row. dates and cents may hold None for rows that weren't
+    parsed in advance; those are parsed here with parse_date() / Decimal,
+    so a caller can skip the vectorized preparation entirely.
+    
+    Returns:
+        The valid rows' transactions (invalid ones go to row_errors)
+    """
     # Parse each row
-    row_errors = []
-    row_num = 1  # Start at 1 (header is row 1, first data row is row 2)
-    for idx, row in df.iterrows():
-        row_num += 1  # Increment to current row number (row 2, 3, 4, etc.)
+    transactions = []
+    for row_num, date_str, date, description, amount_str, clean_amount, amount_cents, transaction_type in zip(
+        row_numbers, date_strs, dates, descriptions, amount_strs,
+        clean_amounts, cents, transaction_types
+    ):
         try:
-            # Skip empty rows
-            if row.isna().all():
-                continue
-            
-            # Parse date (try multiple formats)
-            date_str = str(row[date_col]).strip()
+            # Date (parsed above; parse_date() only for what that left over)
             if date_str == 'nan' or not date_str:
                 row_errors.append(f"Row {row_num}: Missing date value")
                 continue
-            date = parse_date(date_str)
+            if date is None:
+                date = parse_date(date_str)
             
             # Get description
-            description = str(row[desc_col]).strip()
             if not description or description == 'nan':
                 row_errors.append(f"Row {row_num}: Missing description value")
                 continue  # Skip rows with empty descriptions
             
             # Parse amount
-            amount_str = str(row[amount_col]).strip()
             if amount_str == 'nan' or not amount_str:
                 row_errors.append(f"Row {row_num}: Missing amount value")
                 continue
             
-            # Remove currency symbols and commas
-            amount_str = amount_str.replace('$', '').replace(',', '').strip()
-            try:
-                amount = Decimal(amount_str)
-            except (ValueError, Exception) as e:
-                row_errors.append(f"Row {row_num}: Invalid amount '{amount_str}' - {str(e)}")
-                continue
-            
-            # Determine transaction type
-            # Negative amount = expense (debit), positive = income (credit)
-            transaction_type = "debit" if amount < 0 else "credit"
+            # Transaction type: negative amount = expense (debit), positive =
+            # income (credit); already picked for the whole chunk, except for
+            # amounts that weren't plain cents
+            if amount_cents is None:
+                # Not a plain cents amount (e.g. '0.125', '1_000'): exact Decimal
+                # rounding, same as to_cents() on a single create
+                try:
+                    amount = Decimal(clean_amount)
+                    transaction_type = "debit" if amount < 0 else "credit"
+                    amount_cents = to_cents(amount)
+                except (ValueError, Exception) as e:
+                    row_errors.append(f"Row {row_num}: Invalid amount '{clean_amount}' - {str(e)}")
+                    continue
             
             transactions.append({
                 "account_id": account_id,
                 "date": date,
                 "description": description,
-                "amount": amount,
+                "amount_cents": amount_cents,
                 "transaction_type": transaction_type
             })
-            
+        
         except ValueError as e:
             # Date parsing errors
             row_errors.append(f"Row {row_num}: {str(e)}")
@@ -196,26 +694,124 @@ def parse_csv_file(file_content: bytes, account_id: int) -> List[Dict]:
             row_errors.append(f"Row {row_num}: Error parsing row - {str(e)}")
             continue
     
-    # If no valid transactions were parsed, raise an error with details
-    if len(transactions) == 0:
-        error_msg = "No valid transactions could be parsed from the CSV file."
-        if row_errors:
-            error_msg += f" Errors: {'; '.join(row_errors[:5])}"  # Show first 5 errors
-            if len(row_errors) > 5:
-                error_msg += f" (and {len(row_errors) - 5} more errors)"
-        raise ValueError(error_msg)
+    return transactions
+
+
+def _parse_amounts(clean_amounts: List[str]) -> Tuple[List[Optional[int]], List[str]]:
+    """
+    Convert cleaned amount strings to integer cents, vectorized where exact.
     
-    # Log row errors if any (but don't fail if we have at least some valid transactions)
-    if row_errors:
-        print(f"Warning: {len(row_errors)} rows had parsing errors: {row_errors[:10]}")
+    pd.to_numeric() reads the whole column as floats; a value whose float
+    is exactly some k / 100 (finite, below _FLOAT_EXACT_LIMIT) is k cents,
+    which is what to_cents() gives for its string too. Anything else -
+    more than 2 decimals, unparseable, huge - comes back as None and is
+    left to Decimal in _parse_rows().
     
-    return transactions
+    Example: '-5.50' -> -550, '12' -> 1200, '0.125' -> None, 'abc' -> None
+    
+    Returns:
+        (cents per row, transaction type per row - "debit" for negative
+        amounts, "credit" otherwise; only meaningful where cents isn't None)
+    """
+    values = pd.to_numeric(pd.Series(clean_amounts, dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        cents = np.rint(values * 100)
+        exact = (np.abs(values) < _FLOAT_EXACT_LIMIT) & (cents / 100 == values)
+        negative = cents < 0
+    
+    transaction_types = _TRANSACTION_TYPES[negative.view(np.int8)].tolist()
+    return [
+        int(c) if ok else None
+        for c, ok in zip(cents.tolist(), exact.tolist())
+    ], transaction_types
 
 
+def _parse_dates(
+    date_strs: pd.Series,
+    cache: Optional[Dict[str, Optional[datetime]]] = None
+) -> List[Optional[datetime]]:
+    """
+    Parse a column of date strings with DATE_FORMATS, one vectorized pass
+    per candidate format over the values still unparsed; candidates are
+    the formats of the value's shape (see _DATE_LAYOUTS).
+    
+    Bank exports repeat the same few dates across many rows (everything
+    posted on one day), so only the distinct strings are parsed and the
+    results are mapped back to the rows, like read_csv's cache_dates. With
+    a cache (one dict per file), strings seen in an earlier chunk aren't
+    parsed again either; a big export spans a few hundred distinct days
+    but many chunks.
+    
+    Each value gets the first format (in DATE_FORMATS order) that fits,
+    exactly as parse_date() would choose. Values no format fits within
+    pandas' Timestamp range (years 1677-2262; dates in those two years
+    always) come back as None, and so do timestamps with second 60/61
+    (see _LEAP_SECOND_RE), for the caller to hand to parse_date() (which
+    either parses them or produces the error message).
+    
+    Args:
+        date_strs: Stripped date strings
+        cache: Date string -> result of an earlier call (None included);
+               read and filled in place, up to _DATE_CACHE_SIZE entries
+    
+    Returns:
+        One datetime or None per value, in order
+    """
+    # codes[i] is row i's position in uniques
+    codes, uniques = pd.factorize(date_strs.to_numpy())
+    
+    parsed = np.full(len(uniques), None, dtype=object)
+    pending = pd.Series(uniques, copy=False)  # positional index
+    if cache:
+        seen = np.fromiter((value in cache for value in uniques), dtype=bool, count=len(uniques))
+        parsed[seen] = [cache[value] for value in uniques[seen]]
+        pending = pending[~seen]
+    new_values = pending
+    
+    # Bucket the strings by shape (separator, has time), so each bucket
+    # only meets the formats of that shape, in DATE_FORMATS order: e.g.
+    # timestamps take one to_datetime pass instead of seven. The key only
+    # narrows the candidates - a string in the wrong bucket (malformed)
+    # matches none of them and is left to parse_date()
+    buckets = {}
+    for position, value in zip(pending.index, pending.tolist()):
+        has_time = ":" in value
+        if has_time and _LEAP_SECOND_RE.search(value):
+            continue  # Stays None: parse_date() rejects it, as the baseline did
+        shape = ("/" if "/" in value else "-", has_time)
+        buckets.setdefault(shape, []).append(position)
+    
+    for shape, positions in buckets.items():
+        group = pd.Series(uniques[positions], index=positions)
+        for fmt, _ in _DATE_LAYOUTS.get(shape, ()):
+            if group.empty:
+                break
+            hits = pd.to_datetime(group, format=fmt, errors="coerce")
+            found = hits.notna().to_numpy()
+            # In the Timestamp range's first and last year, an earlier format
+            # may have fitted but overflowed (09/03/2262 as September 3rd),
+            # which looks like a miss; leave those to parse_date()
+            keep = found & ~hits.dt.year.isin(_TIMESTAMP_EDGE_YEARS).to_numpy()
+            parsed[group.index[keep]] = pd.DatetimeIndex(hits[keep]).to_pydatetime()
+            group = group[~found]
+    
+    # Bounded: with timestamps every row can be a new string, and the cache
+    # mustn't grow with the file
+    if cache is not None and len(cache) < _DATE_CACHE_SIZE:
+        cache.update(zip(new_values.tolist(), parsed[new_values.index].tolist()))
+    return parsed[codes].tolist()
+
+
+@lru_cache(maxsize=4096)
 def parse_date(date_str: str) -> datetime:
     """
     Parse date string in various formats.
     
+    Memoized: the same date strings come up again and again (in a file and
+    across uploads), and a miss costs up to len(DATE_FORMATS) strptime
+    attempts, each raising ValueError. Failures aren't cached, but they
+    are rare. datetimes are immutable, so sharing the results is safe.
+    
     Common formats:
     - YYYY-MM-DD
     - MM/DD/YYYY
@@ -227,20 +823,34 @@ def parse_date(date_str: str) -> datetime:
     
     Returns:
         datetime object
+    
+    Raises:
+        ValueError: If no format fits
     """
-    # List of common date formats
-    date_formats = [
-        "%Y-%m-%d",
-        "%m/%d/%Y",
-        "%d/%m/%Y",
-        "%Y/%m/%d",
-        "%m-%d-%Y",
-        "%d-%m-%Y",
-        "%Y-%m-%d %H:%M:%S",
-        "%m/%d/%Y %H:%M:%S"
-    ]
+    # Fast path: one regex tells the separator and whether there is a time,
+    # which leaves at most three candidate formats; the digit groups are
+    # checked and converted directly instead of trying strptime format by
+    # format (each miss raising ValueError). Same result as the loop below.
+    match = _DATE_RE.fullmatch(date_str)
+    if match:
+        first, separator, second, third, hour, minute, sec = match.groups()
+        time_fields = (hour, minute, sec) if hour is not None else ()
+        for fmt, fields in _DATE_LAYOUTS.get((separator, bool(time_fields)), ()):
+            values = dict(zip(fields, (first, second, third)))
+            values.update(zip("HMS", time_fields))
+            if len(values["Y"]) != 4 or not all(
+                len(values[field]) <= 2 and low <= int(values[field]) <= high
+                for field, (low, high) in _FIELD_RANGES.items() if field in values
+            ):
+                continue
+            try:
+                return datetime(*(int(values[field]) for field in "YmdHMS" if field in values))
+            except ValueError:
+                continue  # e.g. February 30th: try the next format
+        raise ValueError(f"Unable to parse date: {date_str}")
     
-    for fmt in date_formats:
+    # Anything else an entry of DATE_FORMATS might still accept
+    for fmt in DATE_FORMATS:
         try:
             return datetime.strptime(date_str, fmt)
         except ValueError:
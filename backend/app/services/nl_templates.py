@@ -0,0 +1,203 @@
+"""
+Natural language query templates: answers common questions without the LLM.
+
+Most questions sent to /api/query/nl are one of a few shapes:
+- "How much did I spend on food this month?"
+- "How much did I spend last month?"
+- "What's my total income for 2024?"
+
+For these we match the whole question against regex intents (a phrasing
+plus an optional period, nothing else), pull out the parameters (category,
+time period) and run a pre-written parameterized SQL query. That takes
+milliseconds instead of several seconds of LangChain agent round-trips,
+and the SQL is fixed, so nothing user-supplied is ever spliced into it.
+Anything that doesn't match returns None and the caller falls back to the
+LangChain SQL agent.
+"""
+
+import calendar
+import re
+from datetime import date, datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.models import month_bounds
+
+# Month names and abbreviations -> month number ("september", "sep", "sept")
+_MONTHS = {}
+for _number in range(1, 13):
+    _MONTHS[calendar.month_name[_number].lower()] = _number
+    _MONTHS[calendar.month_abbr[_number].lower()] = _number
+_MONTHS["sept"] = 9
+
+_MONTH_NAMES = "|".join(sorted(_MONTHS, key=len, reverse=True))
+
+# Time periods. A template question may end in at most one of these; any
+# other words ("at starbucks", "in the last 3 months", "vs last month") mean
+# the question isn't one of our shapes and goes to the agent instead.
+_PERIOD = (
+    r"(?:this month|last month|this year|last year"
+    rf"|(?:in|for|during) (?:{_MONTH_NAMES})(?: \d{{4}})?"
+    r"|(?:in|for|during) \d{4})"
+)
+_NAMED_MONTH = re.compile(rf"(?:in|for|during) (?P<month>{_MONTH_NAMES})(?: (?P<year>\d{{4}}))?")
+_YEAR = re.compile(r"(?:in|for|during) (?P<year>\d{4})")
+
+# Intents, checked in order against the whole normalized question (trailing
+# punctuation stripped). Each is anchored at both ends and allows only an
+# optional period after the phrasing, so extra qualifiers never get ignored.
+_HOW_MUCH_SPENT = r"how much (?:did|have|do) i (?:spend|spent)"
+_SPEND_ON_CATEGORY = re.compile(
+    rf"{_HOW_MUCH_SPENT} on (?P<category>[a-z][a-z &'-]*?)(?: (?P<period>{_PERIOD}))?"
+)
+_TOTAL_SPENDING = re.compile(
+    rf"(?:{_HOW_MUCH_SPENT}|(?:(?:what is|what's|what was) )?my total (?:spending|expenses)"
+    rf"|total (?:spending|expenses))(?: (?P<period>{_PERIOD}))?"
+)
+_TOTAL_INCOME = re.compile(
+    r"(?:how much (?:did|have|do) i (?:earn|earned|make|made)"
+    r"|(?:(?:what is|what's|what was) )?my (?:total )?income|total income)"
+    rf"(?: (?P<period>{_PERIOD}))?"
+)
+
+# Words that turn a "spend on <category>" question into something the
+# category template can't answer ("food vs transport", "food in the past week")
+_CATEGORY_STOP_WORDS = {
+    "and", "or", "vs", "versus", "compare", "compared", "average", "at", "from",
+    "this", "last", "past", "in", "for", "during", "since", "per", "each",
+}
+
+# Pre-written queries; the date filter is a fixed fragment added only when
+# the question names a period (values are always bound parameters)
+_DATE_FILTER = " AND t.date >= :start AND t.date < :end"
+
+_SPEND_ON_CATEGORY_SQL = """SELECT COALESCE(SUM(-t.amount_cents), 0) AS total_cents
+FROM transactions t JOIN categories c ON c.id = t.category_id
+WHERE t.user_id = :user_id AND t.amount_cents < 0 AND c.name ILIKE :category"""
+
+_CATEGORY_EXISTS_SQL = "SELECT 1 FROM categories WHERE name ILIKE :category LIMIT 1"
+
+_TOTAL_SPENDING_SQL = """SELECT COALESCE(SUM(-t.amount_cents), 0) AS total_cents
+FROM transactions t
+WHERE t.user_id = :user_id AND t.amount_cents < 0"""
+
+_TOTAL_INCOME_SQL = """SELECT COALESCE(SUM(t.amount_cents), 0) AS total_cents
+FROM transactions t
+WHERE t.user_id = :user_id AND t.amount_cents > 0"""
+
+
+def _parse_period(period: Optional[str], today: date) -> Tuple[Optional[datetime], Optional[datetime], str]:
+    """
+    Turn the period phrase captured by an intent into a date range.
+    
+    Args:
+        period: The matched _PERIOD text ("last month", "in september 2024"),
+            or None when the question names no period
+        today: Reference date for relative periods
+    
+    Returns:
+        (start, end, label): a half-open [start, end) range and a phrase for
+        the answer, or (None, None, "") when no period is named (all time)
+    """
+    if period is None:
+        return None, None, ""
+    
+    if period == "this month":
+        start, end = month_bounds(today.year, today.month)
+        return start, end, " this month"
+    
+    if period == "last month":
+        year, month = (today.year, today.month - 1) if today.month > 1 else (today.year - 1, 12)
+        start, end = month_bounds(year, month)
+        return start, end, " last month"
+    
+    named = _NAMED_MONTH.fullmatch(period)
+    if named:
+        month = _MONTHS[named.group("month")]
+        year = int(named.group("year")) if named.group("year") else today.year
+        start, end = month_bounds(year, month)
+        return start, end, f" in {calendar.month_name[month]} {year}"
+    
+    if period == "this year":
+        year = today.year
+    elif period == "last year":
+        year = today.year - 1
+    else:
+        # _PERIOD only admits the forms above, so this is "in/for/during YYYY"
+        year = int(_YEAR.fullmatch(period).group("year"))
+    return datetime(year, 1, 1), datetime(year + 1, 1, 1), f" in {year}"
+
+
+def _escape_like(value: str) -> str:
+    """Escape LIKE wildcards so user text only matches literally."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def answer_from_template(question: str, user_id: int, db: Session, today: Optional[date] = None) -> Optional[dict]:
+    """
+    Answer a natural language question with a pre-written SQL template.
+    
+    Args:
+        question: The user's question
+        user_id: Current user's ID (every template filters by it)
+        db: Database session
+        today: Reference date for "this month"/"last year" (defaults to today)
+    
+    Returns:
+        {"answer", "sql_query", "data"} if the question matched a template,
+        None otherwise (the caller should fall back to the LLM agent)
+    
+    Example:
+        answer_from_template("How much did I spend on food this month?", 1, db)
+        -> {"answer": "You spent $450.25 on food this month.", ...}
+    """
+    # Lowercase, collapse whitespace and drop trailing "?"/"."/"!" so the
+    # intents can be matched against the question as a whole
+    normalized = " ".join(question.lower().split()).rstrip("?.! ")
+    today = today or date.today()
+    params = {"user_id": user_id}
+    
+    category_match = _SPEND_ON_CATEGORY.fullmatch(normalized)
+    total_spending_match = _TOTAL_SPENDING.fullmatch(normalized)
+    total_income_match = _TOTAL_INCOME.fullmatch(normalized)
+    if category_match:
+        category = category_match.group("category").strip()
+        # "food at starbucks", "food in the last 3 months": more than a category
+        if _CATEGORY_STOP_WORDS.intersection(category.split()):
+            return None
+        sql = _SPEND_ON_CATEGORY_SQL
+        params["category"] = f"%{_escape_like(category)}%"
+        # Unknown category (e.g. "groceries at costco"): let the agent handle
+        # it rather than confidently answering $0.00
+        if db.execute(text(_CATEGORY_EXISTS_SQL), {"category": params["category"]}).first() is None:
+            return None
+        match = category_match
+        answer, all_time = "You spent {total} on " + category + "{period}.", " in total"
+    elif total_spending_match:
+        sql = _TOTAL_SPENDING_SQL
+        match = total_spending_match
+        answer, all_time = "You spent {total}{period}.", " in total"
+    elif total_income_match:
+        sql = _TOTAL_INCOME_SQL
+        match = total_income_match
+        answer, all_time = "Your total income{period} was {total}.", ""
+    else:
+        return None
+    
+    start, end, period = _parse_period(match.group("period"), today)
+    if start is not None:
+        sql += _DATE_FILTER
+        params["start"] = start
+        params["end"] = end
+    
+    # SUM over BIGINT comes back as NUMERIC (Decimal); report plain dollars
+    total_cents = int(db.execute(text(sql), params).scalar() or 0)
+    total = total_cents / 100
+    
+    return {
+        "answer": answer.format(total=f"${total:,.2f}", period=period or all_time),
+        "sql_query": sql,
+        "data": [{"total": total}],
+    }
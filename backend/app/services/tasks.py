@@ -0,0 +1,93 @@
+"""
+Background tasks: slow work that shouldn't hold an HTTP request open.
+
+Used for:
+- Auto-categorizing uploaded transactions (rules + batched OpenAI calls)
+
+Tasks run in the API process via FastAPI's BackgroundTasks, right after
+the response has been sent, so an upload returns as soon as its rows are
+stored. Each task gets an ID; its status lives in the cache service
+(Redis when configured, so any worker can answer a status poll) and can
+be read back with get_task_status().
+
+Status values:
+- "pending": queued, not finished yet
+- "completed": done; "result" holds the categorization statistics
+- "failed": raised an exception; "error" holds the message
+"""
+
+import logging
+import uuid
+from typing import List, Optional
+
+from app.database import SessionLocal
+from app.services.cache import cache_get, cache_set, invalidate_user_insights
+from app.services.categorization import categorize_batch
+
+logger = logging.getLogger(__name__)
+
+# How long a finished task's status can still be polled (seconds)
+TASK_STATUS_TTL = 24 * 3600
+
+
+def _task_key(task_id: str) -> str:
+    return f"task:{task_id}"
+
+
+def create_task(user_id: int) -> str:
+    """
+    Register a new pending task for a user.
+    
+    Args:
+        user_id: Owner of the task (only they can read its status)
+    
+    Returns:
+        The new task ID
+    """
+    task_id = uuid.uuid4().hex
+    cache_set(_task_key(task_id), {"task_id": task_id, "user_id": user_id, "status": "pending"}, TASK_STATUS_TTL)
+    return task_id
+
+
+def get_task_status(task_id: str, user_id: int) -> Optional[dict]:
+    """
+    Look up a task's status.
+    
+    Returns:
+        The status dict, or None if the task is unknown, expired or
+        belongs to another user
+    """
+    status = cache_get(_task_key(task_id))
+    if status is None or status.get("user_id") != user_id:
+        return None
+    return status
+
+
+def run_categorization_task(task_id: str, user_id: int, transaction_ids: List[int], use_ai: bool = True) -> None:
+    """
+    Categorize transactions in the background and record the outcome.
+    
+    Runs after the request that queued it has finished, so it opens its own
+    database session instead of borrowing the request's.
+    
+    Args:
+        task_id: ID from create_task()
+        user_id: Owner of the transactions (their insights cache is dropped)
+        transaction_ids: Transactions to categorize
+        use_ai: Whether to use AI for transactions no rule matches
+    """
+    status = {"task_id": task_id, "user_id": user_id}
+    db = SessionLocal()
+    try:
+        result = categorize_batch(transaction_ids, db, use_ai=use_ai)
+        status.update(status="completed", result=result)
+    except Exception as e:
+        db.rollback()
+        logger.exception("Categorization task %s failed", task_id)
+        status.update(status="failed", error=str(e))
+    finally:
+        db.close()
+    
+    # New categories change this user's monthly breakdown
+    invalidate_user_insights(user_id)
+    cache_set(_task_key(task_id), status, TASK_STATUS_TTL)
@@ -27,10 +27,15 @@ def init_categories():
     """Create default categories if they don't exist."""
     db = SessionLocal()
     try:
+        # Find which ones already exist in one query instead of one per category
+        names = [cat_data["name"] for cat_data in DEFAULT_CATEGORIES]
+        existing = {
+            name for (name,) in
+            db.query(Category.name).filter(Category.name.in_(names)).all()
+        }
+        
         for cat_data in DEFAULT_CATEGORIES:
-            # Check if category already exists
-            existing = db.query(Category).filter(Category.name == cat_data["name"]).first()
-            if not existing:
+            if cat_data["name"] not in existing:
                 category = Category(**cat_data)
                 db.add(category)
                 print(f"Created category: {cat_data['name']}")
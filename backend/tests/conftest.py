@@ -0,0 +1,15 @@
+"""
+Shared pytest setup for the backend tests.
+
+Run from the backend directory with `pytest`. The tests don't talk to a
+real database: Settings only needs DATABASE_URL to be present, and engines
+are created lazily, so a placeholder URL is enough to import the app.
+"""
+
+import os
+import sys
+
+# Make `import app` work when pytest is run from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DATABASE_URL", "postgresql://fintrack@localhost/fintrack_test")
@@ -0,0 +1,74 @@
+"""
+Tests for rule-based categorization.
+
+RuleMatcher must pick exactly the rule that trying matches_pattern() rule
+by rule in priority order would, with or without pyahocorasick.
+"""
+
+import pytest
+
+from app.models import Rule
+from app.services import categorization
+from app.services.categorization import RuleMatcher, matches_pattern
+
+RULES = [
+    Rule(id=1, category_id=1, pattern="STARBUCKS", pattern_type="starts_with"),
+    Rule(id=2, category_id=2, pattern="uber eats", pattern_type="contains"),
+    Rule(id=3, category_id=3, pattern="uber", pattern_type="contains"),
+    Rule(id=4, category_id=4, pattern="rent payment", pattern_type="exact"),
+    Rule(id=5, category_id=5, pattern=r"^AMZN\s*MKTP", pattern_type="regex"),
+    Rule(id=6, category_id=6, pattern="[unclosed", pattern_type="regex"),
+    Rule(id=7, category_id=7, pattern="bucks", pattern_type="contains"),
+    Rule(id=8, category_id=8, pattern="", pattern_type="exact"),
+    Rule(id=9, category_id=9, pattern="coffee", pattern_type="unknown"),
+]
+
+DESCRIPTIONS = [
+    "STARBUCKS STORE #1234", "starbucks", "MY STARBUCKS", "UBER EATS ORDER", "UBER TRIP",
+    "Rent Payment", "RENT PAYMENT JAN", "AMZN MKTP US*2K3", "amzn mktp", "[unclosed",
+    "coffee", "", "SALARY",
+]
+
+
+def _reference(rules, description):
+    """The original loop: the first rule whose pattern matches."""
+    for rule in rules:
+        if matches_pattern(description, rule.pattern, rule.pattern_type):
+            return rule
+    return None
+
+
+@pytest.fixture(params=[True, False], ids=["aho-corasick", "fallback"])
+def automaton(request, monkeypatch):
+    if request.param and not categorization.AHOCORASICK_AVAILABLE:
+        pytest.skip("pyahocorasick not installed")
+    monkeypatch.setattr(categorization, "AHOCORASICK_AVAILABLE", request.param)
+    return request.param
+
+
+@pytest.mark.parametrize("description", DESCRIPTIONS)
+def test_rule_matcher_matches_rule_by_rule_loop(automaton, description):
+    assert RuleMatcher(RULES).match(description) is _reference(RULES, description)
+
+
+def test_rule_matcher_priority_order(automaton):
+    # Same descriptions, rules reversed: the other overlapping rule wins
+    rules = list(reversed(RULES))
+    matcher = RuleMatcher(rules)
+    
+    assert matcher.match("UBER EATS ORDER").id == 3
+    assert matcher.match("STARBUCKS STORE").id == 7
+    for description in DESCRIPTIONS:
+        assert matcher.match(description) is _reference(rules, description)
+
+
+def test_empty_contains_rule_matches_everything(automaton):
+    catch_all = Rule(id=10, category_id=10, pattern="", pattern_type="contains")
+    matcher = RuleMatcher([RULES[0], catch_all])
+    
+    assert matcher.match("STARBUCKS").id == 1
+    assert matcher.match("anything else").id == 10
+
+
+def test_no_rules():
+    assert RuleMatcher([]).match("STARBUCKS") is None
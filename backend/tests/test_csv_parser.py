@@ -0,0 +1,227 @@
+"""
+Tests for the CSV import parser.
+
+Files are parsed by different readers depending on their size (the csv
+module up to SMALL_CSV_MAX_BYTES, pyarrow when installed, pandas' C engine
+otherwise), and all of them must accept and reject exactly the same rows.
+"""
+
+import io
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from app.models import to_cents
+from app.services import csv_parser
+from app.services.csv_parser import iter_csv_file, parse_csv_file
+
+
+def _csv(rows, padding=0):
+    """Build CSV bytes from (date, description, amount) rows plus padding rows."""
+    lines = ["Date,Description,Amount"]
+    lines += [f"{date},{description},{amount}" for date, description, amount in rows]
+    lines += [f"2024-02-01,PADDING ROW {i:06d},-1.00" for i in range(padding)]
+    return ("\n".join(lines) + "\n").encode()
+
+
+def test_leap_seconds_rejected_in_large_files():
+    rows = [
+        ("2024-01-05 10:11:59", "LAST SECOND", "-1.00"),
+        ("2024-01-05 10:11:60", "LEAP SIXTY", "-2.00"),
+        ("2024-01-05 10:11:61", "LEAP SIXTY-ONE", "-3.00"),
+        ("01/05/2024 10:11:60", "LEAP US FORMAT", "-4.00"),
+    ]
+    content = _csv(rows, padding=3000)
+    assert len(content) > csv_parser.SMALL_CSV_MAX_BYTES
+    
+    parsed = parse_csv_file(content, account_id=1)
+    descriptions = {t["description"]: t["date"] for t in parsed}
+    
+    # datetime() has no second 60/61: those rows are errors, not 10:12:00
+    assert descriptions["LAST SECOND"] == datetime(2024, 1, 5, 10, 11, 59)
+    assert "LEAP SIXTY" not in descriptions
+    assert "LEAP SIXTY-ONE" not in descriptions
+    assert "LEAP US FORMAT" not in descriptions
+    assert len(parsed) == 3001
+
+
+# One file exercising the awkward cases: every DATE_FORMATS shape, ambiguous
+# and impossible dates, leap seconds, the Timestamp edge year, NA markers,
+# quoted thousands separators, blank rows and unparseable cells
+MIXED_CSV = b"""Transaction Date,Memo,Amount,Balance
+2024-01-05,STARBUCKS #1,-5.50,100.00
+01/02/2024,AMBIGUOUS US FIRST,-1.00,
+13/02/2024,DAY FIRST ONLY,-2.00,
+2024/03/04,SLASHED ISO,"$1,234.56",
+03-04-2024,DASHED US,-0.01,
+2024-01-05 10:11:12,TIMESTAMP,-3.00,
+01/05/2024 23:59:59,US TIMESTAMP,-4.00,
+2024-01-05 10:11:60,LEAP SECOND,-5.00,
+2024-02-30,FEBRUARY 30TH,-6.00,
+09/03/2262,EDGE YEAR,-7.00,
+2024-01-05,STARBUCKS #1,-5.50,
+NA,MISSING DATE,-8.00,
+2024-01-06,,-9.00,
+2024-01-07,BAD AMOUNT,abc,
+2024-01-08,NULL AMOUNT,NULL,
+,,,
+2024-01-09,"QUOTED, WITH COMMA",-10.00,
+2024-01-10,BIG,12345678901234.56,
+2024-01-11,HALF CENT,-0.005,
+2024-01-12,SALARY,3000,
+"""
+
+
+def _positions(monkeypatch, path):
+    """Force iter_csv_file onto one of its readers, whatever the file size."""
+    if path == "csv":
+        monkeypatch.setattr(csv_parser, "SMALL_CSV_MAX_BYTES", 1 << 30)
+    else:
+        monkeypatch.setattr(csv_parser, "SMALL_CSV_MAX_BYTES", -1)
+    if path == "pyarrow":
+        if not csv_parser.PYARROW_AVAILABLE:
+            pytest.skip("pyarrow not installed")
+    else:
+        monkeypatch.setattr(csv_parser, "PYARROW_AVAILABLE", False)
+
+
+def _parse(monkeypatch, path, content, chunk_size):
+    _positions(monkeypatch, path)
+    transactions = [
+        transaction
+        for chunk in iter_csv_file(io.BytesIO(content), 7, chunk_size=chunk_size)
+        for transaction in chunk
+    ]
+    monkeypatch.undo()
+    return transactions
+
+
+@pytest.mark.parametrize("path", ["pandas", "pyarrow"])
+@pytest.mark.parametrize("chunk_size", [1, 4, 10_000])
+def test_every_reader_parses_the_same_rows(monkeypatch, path, chunk_size):
+    expected = _parse(monkeypatch, "csv", MIXED_CSV, 10_000)
+    
+    assert _parse(monkeypatch, path, MIXED_CSV, chunk_size) == expected
+
+
+def test_mixed_file_rows():
+    parsed = parse_csv_file(MIXED_CSV, account_id=7)
+    by_description = {}
+    for transaction in parsed:
+        by_description.setdefault(transaction["description"], []).append(transaction)
+    
+    assert by_description["STARBUCKS #1"] == [{
+        "account_id": 7,
+        "date": datetime(2024, 1, 5),
+        "description": "STARBUCKS #1",
+        "amount_cents": -550,
+        "transaction_type": "debit",
+    }] * 2
+    # First format in DATE_FORMATS order wins; only day-first fits 13/02
+    assert by_description["AMBIGUOUS US FIRST"][0]["date"] == datetime(2024, 1, 2)
+    assert by_description["DAY FIRST ONLY"][0]["date"] == datetime(2024, 2, 13)
+    assert by_description["SLASHED ISO"][0]["amount_cents"] == 123456
+    assert by_description["SLASHED ISO"][0]["transaction_type"] == "credit"
+    assert by_description["DASHED US"][0]["date"] == datetime(2024, 3, 4)
+    assert by_description["TIMESTAMP"][0]["date"] == datetime(2024, 1, 5, 10, 11, 12)
+    assert by_description["US TIMESTAMP"][0]["date"] == datetime(2024, 1, 5, 23, 59, 59)
+    assert by_description["EDGE YEAR"][0]["date"] == datetime(2262, 9, 3)
+    assert by_description["QUOTED, WITH COMMA"][0]["amount_cents"] == -1000
+    assert by_description["BIG"][0]["amount_cents"] == 1234567890123456
+    assert by_description["HALF CENT"][0]["amount_cents"] == -1  # ROUND_HALF_UP
+    assert by_description["SALARY"][0]["amount_cents"] == 300000
+    for rejected in ("LEAP SECOND", "FEBRUARY 30TH", "MISSING DATE", "BAD AMOUNT", "NULL AMOUNT"):
+        assert rejected not in by_description
+    # The row with an empty description is rejected too
+    assert all(t["description"] for t in parsed)
+    assert len(parsed) == 13
+
+
+def test_max_rows_stops_early():
+    parsed = parse_csv_file(MIXED_CSV, account_id=7, max_rows=3)
+    
+    assert [t["description"] for t in parsed] == ["STARBUCKS #1", "AMBIGUOUS US FIRST", "DAY FIRST ONLY"]
+
+
+def test_no_valid_rows_raises():
+    with pytest.raises(ValueError, match="No valid transactions"):
+        parse_csv_file(b"Date,Description,Amount\nbad,X,1\n", account_id=1)
+
+
+def test_missing_columns_raise():
+    with pytest.raises(ValueError):
+        parse_csv_file(b"When,What\n2024-01-01,X\n", account_id=1)
+
+
+def _strptime_reference(date_str):
+    """The original parse_date: DATE_FORMATS in order through strptime."""
+    for fmt in csv_parser.DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+@pytest.mark.parametrize("date_str", [
+    "2024-01-05", "2024-1-5", "1/2/2024", "01/02/2024", "13/02/2024", "02/13/2024",
+    "2024/02/29", "2023/02/29", "12-31-1999", "31-12-1999", "2024-01-05 10:11:12",
+    "2024-01-05 1:2:3", "01/05/2024 23:59:59", "2024-01-05 24:00:00", "2024-01-05 10:11:60",
+    "2024-01-05 10:11:61", "0001-01-01", "9999-12-31", "24-01-05", "20240105",
+    "2024-01-05T10:11:12", "Jan 5 2024", "2024-01/05", "", "٢٠٢٤-01-05",
+])
+def test_parse_date_matches_strptime(date_str):
+    expected = _strptime_reference(date_str)
+    
+    if expected is None:
+        with pytest.raises(ValueError):
+            csv_parser.parse_date.__wrapped__(date_str)
+    else:
+        assert csv_parser.parse_date.__wrapped__(date_str) == expected
+
+
+def test_parse_dates_vectorized_matches_parse_date():
+    values = ["2024-01-05", "01/02/2024", "13/02/2024", "2024-01-05 10:11:12",
+              "2024-01-05 10:11:60", "2024-02-30", "09/03/2262", "junk", "2024-01-05"]
+    
+    parsed = csv_parser._parse_dates(pd.Series(values))
+    
+    for value, result in zip(values, parsed):
+        if result is not None:
+            assert result == _strptime_reference(value)
+        elif _strptime_reference(value) is None:
+            # Left to parse_date(), which rejects it
+            with pytest.raises(ValueError):
+                csv_parser.parse_date(value)
+        else:
+            # Left to parse_date() (e.g. the Timestamp edge year), which parses it
+            assert csv_parser.parse_date(value) == _strptime_reference(value)
+
+
+def test_parse_dates_reuses_the_file_cache():
+    cache = {}
+    first = csv_parser._parse_dates(pd.Series(["2024-01-05", "junk"]), cache)
+    assert first == [datetime(2024, 1, 5), None]
+    assert cache == {"2024-01-05": datetime(2024, 1, 5), "junk": None}
+    
+    # A cached string isn't parsed again: the cached value comes back as-is
+    sentinel = datetime(1999, 9, 9)
+    cache["2024-01-05"] = sentinel
+    assert csv_parser._parse_dates(pd.Series(["2024-01-05", "2024-01-06"]), cache) == [
+        sentinel, datetime(2024, 1, 6)
+    ]
+
+
+def test_parse_amounts_matches_to_cents():
+    values = ["-5.50", "0.01", "1234.56", "-0.005", "0.125", "12345678901234.56", "3000", "-0"]
+    
+    cents, types = csv_parser._parse_amounts(values)
+    
+    # None means "left to the Decimal path"; the float path must never
+    # disagree with to_cents where it does answer
+    assert cents == [-550, 1, 123456, None, None, None, 300000, 0]
+    for value, amount_cents, transaction_type in zip(values, cents, types):
+        if amount_cents is not None:
+            assert amount_cents == to_cents(value)
+            assert transaction_type == ("debit" if amount_cents < 0 else "credit")
@@ -0,0 +1,60 @@
+"""
+Tests for the money and duplicate-detection helpers in app.models.
+"""
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from app.models import from_cents, to_cents, transaction_dedup_hash
+
+
+@pytest.mark.parametrize("amount, cents", [
+    (Decimal("-5.50"), -550),
+    ("1234.56", 123456),
+    (12, 1200),
+    (0.1, 10),
+    ("0.005", 1),     # ROUND_HALF_UP: away from zero
+    ("-0.005", -1),
+    ("0.004", 0),
+    ("99999999.99", 9999999999),
+    ("12345678901234.56", 1234567890123456),
+])
+def test_to_cents(amount, cents):
+    assert to_cents(amount) == cents
+
+
+def test_from_cents_round_trips():
+    for cents in (-550, 0, 1, 9999999999, -1234567890123456):
+        amount = from_cents(cents)
+        assert amount.as_tuple().exponent == -2
+        assert to_cents(amount) == cents
+    assert str(from_cents(-550)) == "-5.50"
+    assert from_cents(None) is None
+
+
+def test_dedup_hash_is_stable_and_fits_bigint():
+    when = datetime(2024, 1, 5)
+    value = transaction_dedup_hash(when, -550, "STARBUCKS")
+    
+    assert value == transaction_dedup_hash(when, -550, "STARBUCKS")
+    assert -2 ** 63 <= value < 2 ** 63
+    assert value != transaction_dedup_hash(when, -551, "STARBUCKS")
+    assert value != transaction_dedup_hash(when, -550, "STARBUCKS ")
+
+
+def test_dedup_hash_uses_utc_instant():
+    naive = datetime(2024, 1, 5, 12)
+    aware = datetime(2024, 1, 5, 7, tzinfo=timezone(timedelta(hours=-5)))
+    
+    assert transaction_dedup_hash(naive, 100, "X") == transaction_dedup_hash(aware, 100, "X")
+
+
+def test_dedup_hash_occurrences():
+    when = datetime(2024, 1, 5)
+    hashes = {transaction_dedup_hash(when, -450, "COFFEE", n) for n in range(5)}
+    
+    assert len(hashes) == 5
+    # The first occurrence keeps the hash rows had before occurrences existed
+    assert transaction_dedup_hash(when, -450, "COFFEE", 0) == transaction_dedup_hash(when, -450, "COFFEE")
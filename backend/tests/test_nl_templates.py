@@ -0,0 +1,118 @@
+"""
+Tests for the natural language query templates.
+
+A template answer skips the LLM agent entirely, so a question that only
+looks like a template shape must return None rather than a confident
+answer to a different question.
+"""
+
+from datetime import date, datetime
+
+import pytest
+
+from app.services.nl_templates import answer_from_template
+
+TODAY = date(2024, 10, 15)
+
+
+class _Result:
+    def __init__(self, value):
+        self.value = value
+    
+    def first(self):
+        return self.value
+    
+    def scalar(self):
+        return self.value
+
+
+class FakeSession:
+    """Records executed SQL; category lookups hit only `categories`."""
+    
+    def __init__(self, categories=("food & dining", "transport"), total_cents=12345):
+        self.categories = categories
+        self.total_cents = total_cents
+        self.calls = []
+    
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.calls.append((sql, params or {}))
+        if sql.startswith("SELECT 1 FROM categories"):
+            needle = params["category"].strip("%")
+            return _Result((1,) if any(needle in name for name in self.categories) else None)
+        return _Result(self.total_cents)
+
+
+def _ask(question, db=None):
+    db = db or FakeSession()
+    return answer_from_template(question, 1, db, today=TODAY), db
+
+
+@pytest.mark.parametrize("question", [
+    "How much did I spend at Starbucks last month?",
+    "How much did I spend in the last 3 months?",
+    "What was my net income last month?",
+    "Compare my income this month vs last month",
+    "How much did I spend last month vs this month?",
+    "What's my average income this year?",
+    "How much did I earn from freelancing in 2024?",
+    "How much did I spend this week?",
+    "How much did I spend on food in the last 3 months?",
+    "How much did I spend on food at Starbucks?",
+    "How much did I spend on food vs transport?",
+    "What is the weather today?",
+])
+def test_questions_with_extra_qualifiers_fall_back_to_agent(question):
+    result, db = _ask(question)
+    
+    assert result is None
+    # Never ran a SUM for a question we didn't understand
+    assert not any("SUM" in sql for sql, _ in db.calls)
+
+
+def test_total_spending_last_month():
+    result, db = _ask("How much did I spend last month?")
+    
+    assert result["answer"] == "You spent $123.45 last month."
+    assert result["data"] == [{"total": 123.45}]
+    sql, params = db.calls[-1]
+    assert "t.amount_cents < 0" in sql
+    assert params["start"] == datetime(2024, 9, 1)
+    assert params["end"] == datetime(2024, 10, 1)
+
+
+def test_total_spending_all_time_has_no_date_filter():
+    result, db = _ask("how much did i spend")
+    
+    assert result["answer"] == "You spent $123.45 in total."
+    sql, params = db.calls[-1]
+    assert ":start" not in sql
+    assert "start" not in params
+
+
+def test_spend_on_category_with_named_month():
+    result, db = _ask("How much did I spend on food in September 2023?")
+    
+    assert result["answer"] == "You spent $123.45 on food in September 2023."
+    sql, params = db.calls[-1]
+    assert "c.name ILIKE :category" in sql
+    assert params["category"] == "%food%"
+    assert params["start"] == datetime(2023, 9, 1)
+    assert params["end"] == datetime(2023, 10, 1)
+
+
+def test_spend_on_unknown_category_falls_back_to_agent():
+    result, db = _ask("How much did I spend on groceries this month?")
+    
+    assert result is None
+    assert len(db.calls) == 1
+
+
+def test_total_income_for_year():
+    result, db = _ask("What's my total income for 2024?")
+    
+    assert result["answer"] == "Your total income in 2024 was $123.45."
+    sql, params = db.calls[-1]
+    assert "t.amount_cents > 0" in sql
+    assert params["start"] == datetime(2024, 1, 1)
+    assert params["end"] == datetime(2025, 1, 1)
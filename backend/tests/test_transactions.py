@@ -0,0 +1,69 @@
+"""
+Tests for the CSV upload's bulk upsert (no database: the INSERT statement
+is compiled for PostgreSQL and its parameters inspected).
+"""
+
+from datetime import datetime
+
+from sqlalchemy.dialects import postgresql
+
+from app.models import transaction_dedup_hash
+from app.routers.transactions import _upsert_transactions
+
+
+class FakeSession:
+    """Captures each statement; every row comes back as a fresh insert."""
+    
+    def __init__(self):
+        self.hashes = []
+    
+    def execute(self, statement):
+        params = statement.compile(dialect=postgresql.dialect()).params
+        hashes = [params[f"dedup_hash_m{i}"] for i in range(len(params)) if f"dedup_hash_m{i}" in params]
+        self.hashes.append(hashes)
+        return [(i, True) for i in range(len(hashes))]
+
+
+def _row(date, amount_cents, description):
+    return {
+        "account_id": 1,
+        "date": date,
+        "description": description,
+        "amount_cents": amount_cents,
+        "transaction_type": "debit" if amount_cents < 0 else "credit",
+    }
+
+
+def test_identical_rows_in_one_file_are_all_kept():
+    day = datetime(2024, 3, 1)
+    coffee = _row(day, -450, "COFFEE")
+    db = FakeSession()
+    occurrences = {}
+    
+    # Two chunks of one file: the second coffee is in the next chunk
+    new_ids, updated = _upsert_transactions(db, 1, [coffee, _row(day, -1200, "LUNCH")], occurrences)
+    more_ids, more_updated = _upsert_transactions(db, 1, [coffee, coffee], occurrences)
+    
+    assert (len(new_ids), updated, len(more_ids), more_updated) == (2, 0, 2, 0)
+    assert db.hashes == [
+        [transaction_dedup_hash(day, -450, "COFFEE"), transaction_dedup_hash(day, -1200, "LUNCH")],
+        [transaction_dedup_hash(day, -450, "COFFEE", 1), transaction_dedup_hash(day, -450, "COFFEE", 2)],
+    ]
+
+
+def test_reimport_produces_the_same_hashes():
+    day = datetime(2024, 3, 1)
+    rows = [_row(day, -450, "COFFEE"), _row(day, -450, "COFFEE")]
+    first, second = FakeSession(), FakeSession()
+    
+    _upsert_transactions(first, 1, rows, {})
+    _upsert_transactions(second, 1, rows, {})
+    
+    assert first.hashes == second.hashes
+
+
+def test_empty_chunk_runs_no_statement():
+    db = FakeSession()
+    
+    assert _upsert_transactions(db, 1, [], {}) == ([], 0)
+    assert db.hashes == []